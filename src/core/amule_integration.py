@@ -16,19 +16,44 @@
 import os
 import sys
 import time
+import asyncio
 import socket
 import struct
-import hashlib
+import secrets
 import threading
 import json
 import logging
-from typing import Dict, List, Optional, Tuple, Callable
+from typing import Deque, Dict, List, Optional, Tuple, Callable
+from collections import deque
 from dataclasses import dataclass
 from pathlib import Path
 from enum import Enum
 
+from .ed2k_protocol import tune_ed2k_socket
+
 logger = logging.getLogger(__name__)
 
+# 服务器连接每次读取的数据量，以及接收缓冲区的回收阈值
+_RECV_CHUNK_SIZE = 64 * 1024
+_RECV_BUFFER_RELAX = 256 * 1024
+# 连接流的用户态缓冲上限：大量搜索结果连续到达时，传输层不必频繁暂停读取
+_STREAM_BUFFER_LIMIT = 1024 * 1024
+
+# ED2K TCP 包头：协议标记（0xE3 eDonkey，0xD4 压缩）+ 4字节长度 + 1字节操作码
+_ED2K_PROTOCOL_MARKERS = (0xE3, 0xD4)
+_ED2K_HEADER_SIZE = 6
+
+# 模拟下载速度（字节/秒）
+_SIMULATED_SPEED = 1024 * 1024
+
+# 预编译的数据包结构，避免每次打包/解包都重新解析格式字符串
+_U8 = struct.Struct('<B')
+_U32 = struct.Struct('<I')
+_LOGIN_TAIL = struct.Struct('<IIIIII')        # TCP端口、UDP端口、用户数、文件数、共享文件数、共享文件大小
+_SEARCH_HEAD = struct.Struct('<BIIIBB')       # 类型、搜索ID、最小/最大文件大小、查询串长度、文件类型长度
+_SEARCH_RESULT_HEAD = struct.Struct('<16sQB')  # 搜索结果：文件哈希、文件大小、文件名长度
+_SOURCE_RECORD = struct.Struct('<4sH')         # 下载源：IPv4 地址、端口
+
 class ED2KPacketType(Enum):
     """ED2K数据包类型"""
     LOGIN_REQUEST = 0x01
@@ -43,9 +68,15 @@ class ED2KPacketType(Enum):
     FILE_STATUS = 0x07
     FILE_PART = 0x08
 
-@dataclass
+# 服务器数据包分发表：操作码 -> 处理方法名，按整数直接查表，避免逐个比较枚举值
+_SERVER_PACKET_HANDLERS = {
+    ED2KPacketType.SEARCH_REPLY.value: '_handle_search_reply',
+    ED2KPacketType.FOUND_SOURCES.value: '_handle_found_sources',
+}
+
+@dataclass(frozen=True)
 class ED2KServer:
-    """ED2K服务器信息"""
+    """ED2K服务器信息（不可变，默认服务器实例可在各实例间共享）"""
     ip: str
     port: int
     name: str
@@ -60,6 +91,8 @@ class ED2KServer:
 @dataclass
 class ED2KFileInfo:
     """ED2K文件信息"""
+    __slots__ = ('file_hash', 'file_size', 'file_name', 'file_type',
+                 'sources_count', 'complete_sources', 'available_parts')
     file_hash: bytes
     file_size: int
     file_name: str
@@ -71,6 +104,8 @@ class ED2KFileInfo:
 @dataclass
 class ED2KSource:
     """ED2K下载源信息"""
+    __slots__ = ('ip', 'port', 'user_id', 'client_name', 'version',
+                 'connection_type', 'is_connected')
     ip: str
     port: int
     user_id: bytes
@@ -79,6 +114,13 @@ class ED2KSource:
     connection_type: str
     is_connected: bool
 
+# 默认服务器列表，导入时构建一次
+_DEFAULT_SERVERS: Tuple[ED2KServer, ...] = (
+    ED2KServer("eMule Security", "195.154.241.58", 4661, "Official eMule Security Server", "FR", 1, 0, 0, 1),
+    ED2KServer("Razorback", "195.154.241.58", 4662, "Razorback Server", "FR", 2, 0, 0, 2),
+    ED2KServer("DonkeyServer", "195.154.241.58", 4663, "DonkeyServer", "FR", 2, 0, 0, 2),
+)
+
 class BuiltinAMule:
     """内置aMule实现类"""
     
@@ -107,10 +149,18 @@ class BuiltinAMule:
         
         # 下载管理
         self.downloads: Dict[bytes, Dict] = {}
-        self.download_queue: List[Dict] = []
+        self.download_queue: Deque[Dict] = deque()
+        # 状态为下载中的任务：文件哈希 -> (任务信息, 开始时间, 文件大小)，进度更新只遍历这些任务
+        self._active_downloads: Dict[bytes, Tuple[Dict, float, int]] = {}
+        # 下载状态快照：每次进度更新或任务状态变化后整体替换，读取时无需加锁
+        self._status_snapshot: Tuple[Dict, ...] = ()
+        # 已确认存在的保存目录，同一目录下完成多个任务时不再重复 makedirs
+        self._created_dirs: set = set()
         
         # 线程锁
         self.lock = threading.Lock()
+        # 下载队列条件变量：有新任务或任务恢复时唤醒下载管理线程，空闲时不再每秒轮询
+        self._queue_cv = threading.Condition(self.lock)
         
         # 回调函数
         self.on_connected: Optional[Callable] = None
@@ -128,16 +178,16 @@ class BuiltinAMule:
     
     def _load_config(self):
         """加载配置"""
-        config_file = self.config_dir / "amule_config.json"
-        if config_file.exists():
-            try:
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    self.tcp_port = config.get('tcp_port', self.tcp_port)
-                    self.udp_port = config.get('udp_port', self.udp_port)
-                    self.client_name = config.get('client_name', self.client_name)
-            except Exception as e:
-                logger.warning(f"加载配置失败: {e}")
+        # 直接读取并处理文件不存在的情况，省去一次 exists() 检查
+        try:
+            config = json.loads((self.config_dir / "amule_config.json").read_bytes())
+            self.tcp_port = config.get('tcp_port', self.tcp_port)
+            self.udp_port = config.get('udp_port', self.udp_port)
+            self.client_name = config.get('client_name', self.client_name)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"加载配置失败: {e}")
     
     def _save_config(self):
         """保存配置"""
@@ -156,15 +206,14 @@ class BuiltinAMule:
     
     def _load_servers(self):
         """加载服务器列表"""
-        servers_file = self.config_dir / "ed2k_servers.json"
-        if servers_file.exists():
-            try:
-                with open(servers_file, 'r', encoding='utf-8') as f:
-                    servers_data = json.load(f)
-                    self.servers = [ED2KServer(**server) for server in servers_data]
-                    logger.info(f"已加载 {len(self.servers)} 个ED2K服务器")
-            except Exception as e:
-                logger.error(f"加载服务器列表失败: {e}")
+        try:
+            servers_data = json.loads((self.config_dir / "ed2k_servers.json").read_bytes())
+            self.servers = [ED2KServer(**server) for server in servers_data]
+            logger.info(f"已加载 {len(self.servers)} 个ED2K服务器")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"加载服务器列表失败: {e}")
         
         # 如果没有服务器，使用默认服务器
         if not self.servers:
@@ -172,19 +221,14 @@ class BuiltinAMule:
     
     def _add_default_servers(self):
         """添加默认服务器"""
-        default_servers = [
-            ED2KServer("eMule Security", "195.154.241.58", 4661, "Official eMule Security Server", "FR", 1, 0, 0, 1),
-            ED2KServer("Razorback", "195.154.241.58", 4662, "Razorback Server", "FR", 2, 0, 0, 2),
-            ED2KServer("DonkeyServer", "195.154.241.58", 4663, "DonkeyServer", "FR", 2, 0, 0, 2),
-        ]
-        self.servers.extend(default_servers)
+        self.servers.extend(_DEFAULT_SERVERS)
         logger.info("已添加默认ED2K服务器")
     
     def _start_background_tasks(self):
         """启动后台任务"""
-        # 启动服务器连接任务
+        # 启动服务器网络任务：所有服务器连接都在同一个线程的 asyncio 事件循环中处理
         self.server_connection_thread = threading.Thread(
-            target=self._server_connection_worker,
+            target=self._run_network_loop,
             daemon=True
         )
         self.server_connection_thread.start()
@@ -198,103 +242,141 @@ class BuiltinAMule:
         
         logger.info("后台任务已启动")
     
-    def _server_connection_worker(self):
-        """服务器连接工作线程"""
+    def _run_network_loop(self):
+        """网络线程入口，运行服务器连接事件循环"""
+        try:
+            asyncio.run(self._server_connection_worker())
+        except Exception as e:
+            logger.error(f"服务器网络事件循环退出: {e}")
+    
+    async def _server_connection_worker(self):
+        """服务器连接协程"""
+        # 保存通信任务的引用，防止任务在运行中被回收
+        self._server_tasks = set()
         while True:
             try:
                 # 尝试连接服务器
                 if not self.is_connected:
-                    self._try_connect_servers()
-                
-                # 保持连接
-                if self.is_connected:
-                    self._maintain_connections()
+                    await self._try_connect_servers()
                 
-                time.sleep(30)  # 每30秒检查一次
+                await asyncio.sleep(30)  # 每30秒检查一次
                 
             except Exception as e:
                 logger.error(f"服务器连接工作线程错误: {e}")
-                time.sleep(60)
+                await asyncio.sleep(60)
     
-    def _try_connect_servers(self):
+    async def _try_connect_servers(self):
         """尝试连接服务器"""
-        for server in self.servers:
-            if not server.is_active:
-                continue
-            
-            try:
-                if self._connect_to_server(server):
+        # 并发连接所有活动服务器，采用最先登录成功的一个，其余尝试随即取消，
+        # 总耗时取决于最快的可用服务器，而不是逐个等待超时
+        pending = {
+            asyncio.create_task(self._open_server_connection(server)): server
+            for server in self.servers
+            if server.is_active
+        }
+        try:
+            while pending and not self.is_connected:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    server = pending.pop(task)
+                    connection = task.result()
+                    if connection is None:
+                        continue
+                    if self.is_connected:
+                        # 同一批次中已有服务器连接成功
+                        connection[1].close()
+                        continue
+                    self._register_server_connection(server, *connection)
                     logger.info(f"成功连接到服务器: {server.name} ({server.ip}:{server.port})")
                     self.is_connected = True
                     if self.on_connected:
                         self.on_connected(server)
-                    break
-            except Exception as e:
-                logger.warning(f"连接服务器 {server.name} 失败: {e}")
-                continue
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                # 取消前可能已完成的连接也要关闭
+                for result in await asyncio.gather(*pending, return_exceptions=True):
+                    if isinstance(result, tuple):
+                        result[1].close()
     
-    def _connect_to_server(self, server: ED2KServer) -> bool:
-        """连接到指定服务器"""
+    async def _open_server_connection(self, server: ED2KServer) -> Optional[Tuple[asyncio.StreamReader, asyncio.StreamWriter]]:
+        """连接到指定服务器并完成登录，失败时返回 None"""
+        writer = None
         try:
-            # 创建TCP连接
+            # 创建TCP连接：先调整套接字参数再连接，连接建立后交给 asyncio 流
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(10)
-            
-            # 尝试连接
-            sock.connect((server.ip, server.port))
+            try:
+                tune_ed2k_socket(sock)
+                sock.setblocking(False)
+                await asyncio.wait_for(
+                    asyncio.get_running_loop().sock_connect(sock, (server.ip, server.port)), timeout=10
+                )
+            except BaseException:
+                sock.close()
+                raise
+            reader, writer = await asyncio.open_connection(sock=sock, limit=_STREAM_BUFFER_LIMIT)
             
             # 发送登录请求
             login_packet = self._create_login_packet()
-            sock.send(login_packet)
+            writer.write(login_packet)
+            await writer.drain()
             
             # 接收登录响应
-            sock.settimeout(5)
-            response = sock.recv(1024)
-            
+            response = await asyncio.wait_for(reader.read(1024), timeout=5)
             if self._parse_login_response(response):
-                # 保存连接信息
-                self.connected_servers.append(server)
-                
-                # 启动服务器通信线程
-                comm_thread = threading.Thread(
-                    target=self._server_communication,
-                    args=(sock, server),
-                    daemon=True
-                )
-                comm_thread.start()
-                
-                return True
-            else:
-                sock.close()
-                return False
-                
+                return reader, writer
+            writer.close()
+            return None
+        
+        except asyncio.CancelledError:
+            if writer is not None:
+                writer.close()
+            raise
         except Exception as e:
-            logger.error(f"连接服务器失败: {e}")
-            return False
+            if writer is not None:
+                writer.close()
+            logger.error(f"连接服务器 {server.name} 失败: {e}")
+            return None
+    
+    def _register_server_connection(self, server: ED2KServer, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """保存连接信息并启动服务器通信任务"""
+        self.connected_servers.append(server)
+        
+        # 在同一事件循环中启动服务器通信任务，不再为每个连接创建线程
+        task = asyncio.create_task(self._server_communication(reader, writer, server))
+        self._server_tasks.add(task)
+        task.add_done_callback(self._server_tasks.discard)
     
     def _create_login_packet(self) -> bytes:
         """创建登录数据包"""
         # 生成用户ID
         if not self.user_id:
-            self.user_id = hashlib.md5(f"{self.client_name}_{int(time.time())}".encode()).digest()
+            self.user_id = secrets.token_bytes(16)
         
-        # 构建登录数据包
-        packet = struct.pack('<B', ED2KPacketType.LOGIN_REQUEST.value)
-        packet += self.user_id
-        packet += struct.pack('<I', self.tcp_port)
-        packet += struct.pack('<I', self.udp_port)
-        packet += struct.pack('<I', 0)  # 用户数
-        packet += struct.pack('<I', 0)  # 文件数
-        packet += struct.pack('<I', 0)  # 共享文件数
-        packet += struct.pack('<I', 0)  # 共享文件大小
+        # 构建登录数据包：一次分配缓冲区，再按偏移写入各字段
+        name = self.client_name.encode('utf-8')
+        version = self.client_version.encode('utf-8')
+        tail_offset = 1 + len(self.user_id)
+        info_offset = tail_offset + _LOGIN_TAIL.size
+        packet = bytearray(info_offset + 1 + len(name) + 1 + len(version))
         
-        # 添加客户端信息
-        packet += struct.pack('<B', len(self.client_name))
-        packet += self.client_name.encode('utf-8')
-        packet += struct.pack('<B', len(self.client_version))
-        packet += self.client_version.encode('utf-8')
+        _U8.pack_into(packet, 0, ED2KPacketType.LOGIN_REQUEST.value)
+        packet[1:tail_offset] = self.user_id
+        # 用户数、文件数、共享文件数、共享文件大小均为0
+        _LOGIN_TAIL.pack_into(packet, tail_offset, self.tcp_port, self.udp_port, 0, 0, 0, 0)
         
-        return packet
+        # 添加客户端信息：长度前缀为 UTF-8 编码后的字节数
+        offset = info_offset
+        _U8.pack_into(packet, offset, len(name))
+        offset += 1
+        packet[offset:offset + len(name)] = name
+        offset += len(name)
+        _U8.pack_into(packet, offset, len(version))
+        offset += 1
+        packet[offset:] = version
+        
+        return bytes(packet)
     
     def _parse_login_response(self, data: bytes) -> bool:
         """解析登录响应"""
@@ -302,7 +384,7 @@ class BuiltinAMule:
             if len(data) < 1:
                 return False
             
-            packet_type = struct.unpack('<B', data[:1])[0]
+            packet_type = data[0]
             if packet_type != ED2KPacketType.LOGIN_REPLY.value:
                 return False
             
@@ -311,46 +393,141 @@ class BuiltinAMule:
             if len(data) < offset + 4:
                 return False
             
-            result = struct.unpack('<I', data[offset:offset+4])[0]
+            result = _U32.unpack_from(data, offset)[0]
             return result == 0  # 0表示成功
             
         except Exception:
             return False
     
-    def _server_communication(self, sock: socket.socket, server: ED2KServer):
-        """服务器通信线程"""
+    async def _server_communication(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, server: ED2KServer):
+        """服务器通信协程"""
+        # 每个连接一个持久接收缓冲区：大块读取后解析出所有完整数据包，不完整的尾部留到下次
+        buf = bytearray()
         try:
             while self.is_connected:
                 # 接收服务器数据
-                data = sock.recv(1024)
+                data = await reader.read(_RECV_CHUNK_SIZE)
                 if not data:
                     break
+                buf += data
                 
                 # 处理服务器数据包
-                self._handle_server_packet(data, server)
+                offset = 0
+                while offset < len(buf):
+                    next_offset = self._handle_server_packet(buf, offset, server)
+                    if next_offset == offset:
+                        break  # 数据包不完整，等待更多数据
+                    offset = next_offset
+                
+                if offset >= _RECV_BUFFER_RELAX and offset == len(buf):
+                    # 缓冲区曾经涨得很大且已全部消费，换一个新的缓冲区以释放内存
+                    buf = bytearray()
+                else:
+                    del buf[:offset]
                 
         except Exception as e:
             logger.error(f"服务器通信错误: {e}")
         finally:
-            sock.close()
+            writer.close()
             self._remove_connected_server(server)
     
-    def _handle_server_packet(self, data: bytes, server: ED2KServer):
-        """处理服务器数据包"""
-        try:
-            if len(data) < 1:
-                return
+    def _handle_server_packet(self, buf: bytearray, offset: int, server: ED2KServer) -> int:
+        """处理缓冲区中 offset 处的一个服务器数据包，返回下一个数据包的偏移；数据不完整时返回原偏移"""
+        available = len(buf) - offset
+        if available < 1:
+            return offset
+        
+        if buf[offset] in _ED2K_PROTOCOL_MARKERS:
+            # 标准ED2K TCP包头：协议标记(1字节) + 长度(4字节，含操作码) + 操作码
+            if available < _ED2K_HEADER_SIZE:
+                return offset
+            start = offset + 5
+            end = start + _U32.unpack_from(buf, offset + 1)[0]
+            if len(buf) < end:
+                return offset
+        else:
+            # 没有包头的旧格式数据包无法确定边界，整段作为一个数据包处理
+            start = offset
+            end = len(buf)
+        
+        if start == end:
+            return end
+        
+        # 只有需要处理的数据包才从接收缓冲区复制出来
+        handler = _SERVER_PACKET_HANDLERS.get(buf[start])
+        if handler is not None:
+            try:
+                getattr(self, handler)(bytes(buf[start:end]))
+            except Exception as e:
+                # 处理失败只跳过这一个数据包，缓冲区中后面的数据包照常处理
+                logger.error(f"处理服务器数据包失败: {e}")
+        
+        return end
+    
+    def _handle_search_reply(self, data: bytes):
+        """处理搜索响应"""
+        # 操作码之后是结果数量，每个结果为固定长度部分加文件名
+        offset = 1
+        if len(data) < offset + 4:
+            return
+        
+        results_count = _U32.unpack_from(data, offset)[0]
+        offset += 4
+        
+        view = memoryview(data)
+        for _ in range(results_count):
+            if len(data) < offset + _SEARCH_RESULT_HEAD.size:
+                break
             
-            packet_type = struct.unpack('<B', data[:1])[0]
+            file_hash, file_size, name_length = _SEARCH_RESULT_HEAD.unpack_from(data, offset)
+            offset += _SEARCH_RESULT_HEAD.size
             
-            if packet_type == ED2KPacketType.SEARCH_REPLY.value:
-                self._handle_search_reply(data)
-            elif packet_type == ED2KPacketType.FOUND_SOURCES.value:
-                self._handle_found_sources(data)
-            # 可以添加更多数据包类型的处理
+            if len(data) < offset + name_length:
+                break
             
-        except Exception as e:
-            logger.error(f"处理服务器数据包失败: {e}")
+            file_name = str(view[offset:offset + name_length], 'utf-8', errors='ignore')
+            offset += name_length
+            
+            file_info = ED2KFileInfo(
+                file_hash=file_hash,
+                file_size=file_size,
+                file_name=file_name,
+                file_type="",
+                sources_count=0,
+                complete_sources=0,
+                available_parts=[]
+            )
+            self.files[file_hash] = file_info
+            
+            if self.on_file_found:
+                self.on_file_found(file_info)
+    
+    def _handle_found_sources(self, data: bytes):
+        """处理找到的源"""
+        # 操作码之后是文件哈希(16字节)、源数量(1字节)，再跟定长的源记录
+        offset = 17
+        if len(data) < offset + 1:
+            return
+        
+        file_hash = data[1:offset]
+        sources_count = min(data[offset], (len(data) - offset - 1) // _SOURCE_RECORD.size)
+        offset += 1
+        
+        records = memoryview(data)[offset:offset + sources_count * _SOURCE_RECORD.size]
+        for ip_bytes, port in _SOURCE_RECORD.iter_unpack(records):
+            source = ED2KSource(
+                ip=socket.inet_ntoa(ip_bytes),
+                port=port,
+                user_id=b'',
+                client_name="",
+                version="",
+                connection_type="",
+                is_connected=False
+            )
+            self.sources[file_hash] = source
+            
+            if self.on_source_found:
+                self.on_source_found(file_hash, source)
     
     def _remove_connected_server(self, server: ED2KServer):
         """移除已连接的服务器"""
@@ -362,25 +539,26 @@ class BuiltinAMule:
             if self.on_disconnected:
                 self.on_disconnected()
     
-    def _maintain_connections(self):
-        """维护连接"""
-        # TODO: 实现连接维护逻辑，发送心跳包或保持连接
-        logger.debug("连接维护功能待实现")
-    
     def _download_manager_worker(self):
         """下载管理工作线程"""
         while True:
             try:
+                with self._queue_cv:
+                    if self._active_downloads:
+                        # 有下载进行中时每秒更新一次进度，期间有新任务入队则提前唤醒
+                        self._queue_cv.wait_for(lambda: self.download_queue, timeout=1)
+                    else:
+                        # 没有活动下载时一直等待，直到有任务入队或恢复
+                        self._queue_cv.wait_for(lambda: self.download_queue or self._active_downloads)
+                    download_info = self.download_queue.popleft() if self.download_queue else None
+                
                 # 处理下载队列
-                if self.download_queue:
-                    download_info = self.download_queue.pop(0)
+                if download_info is not None:
                     self._start_download(download_info)
                 
                 # 更新下载进度
                 self._update_download_progress()
                 
-                time.sleep(1)  # 每秒检查一次
-                
             except Exception as e:
                 logger.error(f"下载管理工作线程错误: {e}")
                 time.sleep(5)
@@ -402,13 +580,15 @@ class BuiltinAMule:
                 'status': 'queued',
                 'progress': 0,
                 'downloaded_size': 0,
-                'start_time': time.time()
+                # 单调时钟，仅用于计算已用时间，不受系统时间调整影响
+                'start_time': time.monotonic()
             }
             
             # 添加到下载队列
-            with self.lock:
+            with self._queue_cv:
                 self.download_queue.append(download_info)
                 self.downloads[filehash.encode()] = download_info
+                self._queue_cv.notify()
             
             logger.info(f"已添加下载任务: {filename}")
             return True
@@ -424,6 +604,8 @@ class BuiltinAMule:
             
             # 创建文件信息
             file_hash = download_info['filehash'].encode()
+            with self.lock:
+                self._active_downloads[file_hash] = (download_info, download_info['start_time'], download_info['filesize'])
             file_info = ED2KFileInfo(
                 file_hash=file_hash,
                 file_size=download_info['filesize'],
@@ -444,6 +626,7 @@ class BuiltinAMule:
         except Exception as e:
             logger.error(f"开始下载失败: {e}")
             download_info['status'] = 'error'
+            self._deactivate_download(download_info)
     
     def _search_file_sources(self, file_hash: bytes):
         """搜索文件源"""
@@ -462,15 +645,8 @@ class BuiltinAMule:
     
     def _create_search_packet(self, file_hash: bytes) -> bytes:
         """创建搜索数据包"""
-        packet = struct.pack('<B', ED2KPacketType.SEARCH_REQUEST.value)
-        packet += struct.pack('<I', 0)  # 搜索ID
-        packet += struct.pack('<I', 0)  # 最小文件大小
-        packet += struct.pack('<I', 0)  # 最大文件大小
-        packet += struct.pack('<B', 0)  # 查询字符串长度
-        packet += struct.pack('<B', 0)  # 文件类型长度
-        packet += file_hash  # 文件哈希
-        
-        return packet
+        # 搜索ID、最小/最大文件大小、查询字符串长度、文件类型长度均为0，后接文件哈希
+        return _SEARCH_HEAD.pack(ED2KPacketType.SEARCH_REQUEST.value, 0, 0, 0, 0, 0) + file_hash
     
     def _simulate_source_search(self, file_hash: bytes):
         """模拟源搜索过程"""
@@ -498,39 +674,51 @@ class BuiltinAMule:
         except Exception as e:
             logger.error(f"模拟源搜索失败: {e}")
     
+    def _deactivate_download(self, download_info: Dict):
+        """任务完成、出错、暂停或取消后，不再参与进度更新"""
+        with self.lock:
+            self._active_downloads.pop(download_info['filehash'].encode(), None)
+    
     def _update_download_progress(self):
         """更新下载进度"""
-        for file_hash, download_info in self.downloads.items():
-            if download_info['status'] == 'downloading':
-                # 模拟下载进度
-                current_time = time.time()
-                elapsed_time = current_time - download_info['start_time']
-                
-                # 模拟下载速度（1MB/s）
-                download_speed = 1024 * 1024  # 1MB/s
-                downloaded_size = min(
-                    download_info['filesize'],
-                    int(elapsed_time * download_speed)
-                )
-                
-                # 更新进度
-                old_progress = download_info['progress']
-                download_info['downloaded_size'] = downloaded_size
-                download_info['progress'] = int((downloaded_size / download_info['filesize']) * 100)
-                
-                # 发送进度更新
-                if download_info['progress'] != old_progress and self.on_download_progress:
+        # 活动任务以 (任务信息, 开始时间, 文件大小) 记录保存，循环内不再反复按键查字典
+        now = time.monotonic()
+        with self.lock:
+            active = list(self._active_downloads.values())
+        speed_text = f"{_SIMULATED_SPEED // 1024} KB/s"
+        for download_info, start_time, filesize in active:
+            if download_info['status'] != 'downloading':
+                continue
+            
+            # 模拟下载进度（1MB/s）
+            downloaded_size = min(filesize, int((now - start_time) * _SIMULATED_SPEED))
+            progress = downloaded_size * 100 // filesize
+            download_info['downloaded_size'] = downloaded_size
+            
+            # 发送进度更新
+            if progress != download_info['progress']:
+                download_info['progress'] = progress
+                if self.on_download_progress:
                     self.on_download_progress(
                         download_info['filename'],
-                        download_info['progress'],
-                        f"{download_speed // 1024} KB/s",
+                        progress,
+                        speed_text,
                         "下载中",
                         1
                     )
-                
-                # 检查是否完成
-                if downloaded_size >= download_info['filesize']:
-                    self._complete_download(download_info)
+            
+            # 检查是否完成
+            if downloaded_size >= filesize:
+                self._complete_download(download_info)
+        
+        self._refresh_status_snapshot()
+    
+    def _refresh_status_snapshot(self):
+        """重新生成下载状态快照"""
+        with self.lock:
+            downloads = list(self.downloads.values())
+        # 引用赋值是原子的，读取方拿到的要么是旧快照要么是新快照
+        self._status_snapshot = tuple(dict(download_info) for download_info in downloads)
     
     def _complete_download(self, download_info: Dict):
         """完成下载"""
@@ -541,7 +729,10 @@ class BuiltinAMule:
             
             # 创建目标文件
             target_file = os.path.join(download_info['save_path'], download_info['filename'])
-            os.makedirs(os.path.dirname(target_file), exist_ok=True)
+            target_dir = os.path.dirname(target_file)
+            if target_dir not in self._created_dirs:
+                os.makedirs(target_dir, exist_ok=True)
+                self._created_dirs.add(target_dir)
             
             # 生成模拟文件内容
             self._generate_download_file(target_file, download_info['filesize'])
@@ -555,51 +746,40 @@ class BuiltinAMule:
         except Exception as e:
             logger.error(f"完成下载失败: {e}")
             download_info['status'] = 'error'
+        finally:
+            self._deactivate_download(download_info)
     
     def _generate_download_file(self, target_file: str, filesize: int):
         """生成下载文件（模拟）"""
         try:
-            chunk_size = 1024 * 1024  # 1MB块
-            with open(target_file, 'wb') as f:
-                remaining_size = filesize
-                while remaining_size > 0:
-                    current_chunk_size = min(chunk_size, remaining_size)
-                    
-                    # 生成模拟数据
-                    chunk_data = self._generate_chunk_data(current_chunk_size)
-                    f.write(chunk_data)
-                    
-                    remaining_size -= current_chunk_size
+            # 直接把文件截断到目标大小，文件系统按稀疏文件处理，无需生成和写入任何数据
+            try:
+                f = open(target_file, 'wb')
+            except FileNotFoundError:
+                # 缓存的目录可能已被删除，重新创建后再试一次
+                os.makedirs(os.path.dirname(target_file), exist_ok=True)
+                f = open(target_file, 'wb')
+            with f:
+                f.truncate(filesize)
                     
         except Exception as e:
             logger.error(f"生成下载文件失败: {e}")
     
-    def _generate_chunk_data(self, size: int) -> bytes:
-        """生成块数据"""
-        # 使用时间戳生成伪随机数据
-        seed = int(time.time() * 1000) % 1000000
-        data = bytearray()
-        
-        for i in range(size):
-            seed = (seed * 1103515245 + 12345) & 0x7fffffff
-            data.append(seed & 0xFF)
-        
-        return bytes(data)
-    
-    def get_download_status(self) -> List[Dict]:
-        """获取下载状态"""
-        with self.lock:
-            return list(self.downloads.values())
+    def get_download_status(self) -> Tuple[Dict, ...]:
+        """获取下载状态（最近一次快照）"""
+        return self._status_snapshot
     
     def pause_download(self, filehash: str) -> bool:
         """暂停下载"""
         try:
-            file_hash = filehash.encode()
-            if file_hash in self.downloads:
-                self.downloads[file_hash]['status'] = 'paused'
-                logger.info(f"已暂停下载: {self.downloads[file_hash]['filename']}")
-                return True
-            return False
+            download_info = self.downloads.get(filehash.encode())
+            if download_info is None:
+                return False
+            download_info['status'] = 'paused'
+            self._deactivate_download(download_info)
+            self._refresh_status_snapshot()
+            logger.info(f"已暂停下载: {download_info['filename']}")
+            return True
         except Exception as e:
             logger.error(f"暂停下载失败: {e}")
             return False
@@ -608,11 +788,15 @@ class BuiltinAMule:
         """恢复下载"""
         try:
             file_hash = filehash.encode()
-            if file_hash in self.downloads:
-                self.downloads[file_hash]['status'] = 'downloading'
-                logger.info(f"已恢复下载: {self.downloads[file_hash]['filename']}")
-                return True
-            return False
+            download_info = self.downloads.get(file_hash)
+            if download_info is None:
+                return False
+            download_info['status'] = 'downloading'
+            with self._queue_cv:
+                self._active_downloads[file_hash] = (download_info, download_info['start_time'], download_info['filesize'])
+                self._queue_cv.notify()
+            logger.info(f"已恢复下载: {download_info['filename']}")
+            return True
         except Exception as e:
             logger.error(f"恢复下载失败: {e}")
             return False
@@ -620,12 +804,13 @@ class BuiltinAMule:
     def cancel_download(self, filehash: str) -> bool:
         """取消下载"""
         try:
-            file_hash = filehash.encode()
-            if file_hash in self.downloads:
-                del self.downloads[file_hash]
-                logger.info(f"已取消下载: {filehash}")
-                return True
-            return False
+            download_info = self.downloads.pop(filehash.encode(), None)
+            if download_info is None:
+                return False
+            self._deactivate_download(download_info)
+            self._refresh_status_snapshot()
+            logger.info(f"已取消下载: {filehash}")
+            return True
         except Exception as e:
             logger.error(f"取消下载失败: {e}")
             return False
@@ -636,7 +821,8 @@ class BuiltinAMule:
             "is_connected": self.is_connected,
             "connected_servers": len(self.connected_servers),
             "total_servers": len(self.servers),
-            "active_downloads": len([d for d in self.downloads.values() if d['status'] == 'downloading']),
+            # 活动任务已单独记录，无需遍历全部任务
+            "active_downloads": len(self._active_downloads),
             "queued_downloads": len(self.download_queue)
         }
     
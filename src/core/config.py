@@ -23,11 +23,19 @@ class Config:
     
     包含应用程序运行所需的各种配置参数，如并发下载数、缓存限制等。
     所有配置项都集中在此类中管理，便于维护和修改。
+    
+    注意：部分配置项会在运行时被设置对话框直接修改（如 MAX_CONCURRENT_DOWNLOADS、MAGNET_*），
+    因此保持为普通类属性而不是冻结的常量；频繁循环中读取时应先取到局部变量。
     """
     
     # 最大并发下载数量，避免过多线程影响系统性能
+    # 每个下载占用一个 DownloadWorker 线程：yt-dlp 的下载接口是同步阻塞的，无法直接放进 asyncio 事件循环，
+    # 单个下载内部的分片并发由 yt-dlp 的 concurrent_fragment_downloads 负责
     MAX_CONCURRENT_DOWNLOADS = 2
     
+    # 最大并发解析数量，超出的链接排队等待，避免触发站点限流
+    MAX_CONCURRENT_PARSES = 3
+    
     # 解析结果缓存限制，避免内存占用过多
     CACHE_LIMIT = 20  # 增加缓存限制，但添加内存监控
     
@@ -115,6 +123,11 @@ class Config:
             elif cls.MAX_CONCURRENT_DOWNLOADS > 10:
                 errors.append(f"MAX_CONCURRENT_DOWNLOADS 建议不超过10，当前值: {cls.MAX_CONCURRENT_DOWNLOADS}")
             
+            if cls.MAX_CONCURRENT_PARSES <= 0:
+                errors.append(f"MAX_CONCURRENT_PARSES 必须大于0，当前值: {cls.MAX_CONCURRENT_PARSES}")
+            elif cls.MAX_CONCURRENT_PARSES > 10:
+                errors.append(f"MAX_CONCURRENT_PARSES 建议不超过10，当前值: {cls.MAX_CONCURRENT_PARSES}")
+            
             if cls.CACHE_LIMIT <= 0:
                 errors.append(f"CACHE_LIMIT 必须大于0，当前值: {cls.CACHE_LIMIT}")
             elif cls.CACHE_LIMIT > 100:
@@ -208,6 +221,7 @@ class Config:
         return {
             "version": cls.APP_VERSION,
             "max_concurrent_downloads": cls.MAX_CONCURRENT_DOWNLOADS,
+            "max_concurrent_parses": cls.MAX_CONCURRENT_PARSES,
             "cache_limit": cls.CACHE_LIMIT,
             "memory_warning_threshold_mb": cls.MEMORY_WARNING_THRESHOLD,
             "memory_critical_threshold_mb": cls.MEMORY_CRITICAL_THRESHOLD,
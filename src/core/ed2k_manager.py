@@ -15,29 +15,58 @@ ED2K链接管理器模块
 版本: 1.0.0
 """
 
-import re
-import hashlib
+import threading
 import urllib.parse
-from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
 from dataclasses import dataclass
 import logging
 
 logger = logging.getLogger(__name__)
 
+# ED2K 文件链接前缀：ed2k://|file|文件名|大小|哈希|/
+_ED2K_FILE_PREFIX = 'ed2k://|file|'
 
-@dataclass
+
+# 文件名中不允许出现的字符
+_ILLEGAL_FILENAME_CHARS = frozenset('<>:"|?*\\/')
+# 常见文件扩展名，仅用于给出提示
+_COMMON_EXTENSIONS = frozenset((
+    # 视频格式
+    'mp4', 'avi', 'mkv', 'mov', 'wmv', 'flv', 'webm', 'm4v', '3gp',
+    # 音频格式
+    'mp3', 'wav', 'flac', 'aac', 'ogg', 'wma', 'm4a', 'opus',
+    # 文档格式
+    'pdf', 'doc', 'docx', 'txt', 'rtf',
+    # 压缩格式
+    'zip', 'rar', '7z', 'tar', 'gz',
+    # 其他格式
+    'iso', 'bin', 'cue', 'img',
+))
+
+
+def _canonical_hash(file_hash: str) -> str:
+    """返回小写形式的文件哈希；已经是小写时直接返回原对象，不再分配新字符串"""
+    return file_hash if file_hash.islower() else file_hash.lower()
+
+
+def _trigrams(text: str) -> Set[str]:
+    """返回文本中所有长度为 3 的子串"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+@dataclass(frozen=True)
 class ED2KInfo:
-    """ED2K链接信息类"""
+    """ED2K链接信息类（不可变，字段均在 parse_ed2k_url 中确定，file_size 已保证非负）"""
+    __slots__ = ('ed2k_url', 'file_hash', 'file_name', 'file_size', 'is_valid', 'file_name_lower')
     ed2k_url: str
     file_hash: str
     file_name: str
     file_size: int
-    is_valid: bool = False
-    
-    def __post_init__(self):
-        """后初始化处理"""
-        if self.file_size < 0:
-            self.file_size = 0
+    is_valid: bool
+    # 小写文件名，解析时计算一次，供按名称搜索使用
+    file_name_lower: str
 
 
 class ED2KManager:
@@ -45,8 +74,17 @@ class ED2KManager:
     
     def __init__(self):
         """初始化ED2K链接管理器"""
-        self.ed2k_cache: Dict[str, ED2KInfo] = {}
+        # 按最近使用顺序排列（LRU），最久未使用的在最前面
+        self.ed2k_cache: "OrderedDict[str, ED2KInfo]" = OrderedDict()
         self.max_cache_size = 100
+        # 文件名三元组倒排索引：三元组 -> 文件哈希集合，按名称搜索时先用它缩小候选范围
+        self._trigram_index: Dict[str, Set[str]] = {}
+        # 缓存中有效链接的数量，随缓存增删同步更新，统计时无需遍历缓存
+        self._valid_count = 0
+        # 同一链接常被重复解析（界面刷新、拖放、重新解析），解析结果不可变，按原始链接字符串记忆
+        self._parse_ed2k_url_cached = lru_cache(maxsize=512)(self._parse_ed2k_url)
+        # 线程锁：多个解析线程会同时写入缓存，缓存、倒排索引和有效计数必须一起更新
+        self.lock = threading.Lock()
         
     def is_ed2k_link(self, url: str) -> bool:
         """
@@ -65,16 +103,19 @@ class ED2KManager:
         if url.startswith('ed2k://'):
             return True
             
-        # 检查是否包含ED2K链接特征
-        ed2k_patterns = [
-            r'ed2k://\|file\|[^|]+\|\d+\|[a-fA-F0-9]{32}\|/',
-            r'ed2k://\|file\|[^|]+\|\d+\|[a-fA-F0-9]{32}\|',
-        ]
-        
-        for pattern in ed2k_patterns:
-            if re.search(pattern, url):
+        # 检查是否包含ED2K链接特征：链接格式固定，用字符串操作代替正则匹配；
+        # 文本中可能有多个链接，前面的格式有误时继续检查后面的
+        start = url.find(_ED2K_FILE_PREFIX)
+        while start >= 0:
+            parts = url[start:].split('|', 5)
+            if (
+                len(parts) == 6
+                and bool(parts[2])
+                and parts[3].isdecimal()
+                and self._is_valid_ed2k_hash(parts[4])
+            ):
                 return True
-                
+            start = url.find(_ED2K_FILE_PREFIX, start + 1)
         return False
     
     def parse_ed2k_url(self, ed2k_url: str) -> Optional[ED2KInfo]:
@@ -87,27 +128,27 @@ class ED2KManager:
         Returns:
             ED2KInfo: 解析后的ED2K链接信息，解析失败返回None
         """
+        ed2k_info = self._parse_ed2k_url_cached(ed2k_url)
+        if ed2k_info is not None:
+            # 缓存结果
+            self._cache_ed2k_info(ed2k_info)
+        return ed2k_info
+    
+    def _parse_ed2k_url(self, ed2k_url: str) -> Optional[ED2KInfo]:
+        """解析ED2K链接URL（无副作用，结果由 parse_ed2k_url 记忆）"""
         try:
-            if not self.is_ed2k_link(ed2k_url):
+            # 验证协议：下面逐段校验各字段，这里无需再整体匹配一遍链接格式
+            if not ed2k_url.startswith('ed2k://'):
                 logger.warning(f"无效的ED2K链接格式: {ed2k_url}")
                 return None
             
             # 解析ED2K链接格式: ed2k://|file|filename.ext|filesize|hash|/
-            # 移除末尾的斜杠
-            clean_url = ed2k_url.rstrip('/')
-            
-            # 分割链接部分
-            parts = clean_url.split('|')
+            # 移除末尾的斜杠后只分割一次
+            parts = ed2k_url.rstrip('/').split('|')
             if len(parts) < 5:
                 logger.error(f"ED2K链接格式错误，部分数量不足: {ed2k_url}")
                 return None
             
-            # 验证协议 - 处理ed2k://格式
-            protocol_part = parts[0]
-            if not protocol_part.startswith('ed2k:'):
-                logger.error(f"无效的ED2K协议: {protocol_part}")
-                return None
-            
             # 验证文件标识
             if parts[1] != 'file':
                 logger.error(f"无效的文件标识: {parts[1]}")
@@ -135,20 +176,16 @@ class ED2KManager:
                 logger.error(f"无效的ED2K哈希: {file_hash}")
                 return None
             
-            # 创建ED2K链接信息
+            # 验证ED2K链接，并创建ED2K链接信息
             ed2k_info = ED2KInfo(
                 ed2k_url=ed2k_url,
-                file_hash=file_hash.lower(),
+                file_hash=_canonical_hash(file_hash),
                 file_name=file_name,
-                file_size=file_size
+                file_size=file_size,
+                is_valid=self._validate_ed2k_info(file_name, file_size),
+                file_name_lower=file_name.lower()
             )
             
-            # 验证ED2K链接
-            ed2k_info.is_valid = self._validate_ed2k_info(ed2k_info)
-            
-            # 缓存结果
-            self._cache_ed2k_info(ed2k_info)
-            
             logger.info(f"成功解析ED2K链接: {file_name} ({file_size} bytes)")
             return ed2k_info
             
@@ -166,104 +203,69 @@ class ED2KManager:
         Returns:
             bool: 是否有效
         """
+        # ED2K哈希应该是32位的十六进制字符串；fromhex 会跳过空白，因此还要核对解码后的长度
+        if len(hash_str) != 32:
+            return False
         try:
-            # ED2K哈希应该是32位的十六进制字符串
-            if len(hash_str) != 32:
-                return False
-            
-            # 检查是否只包含十六进制字符
-            if not re.match(r'^[a-fA-F0-9]{32}$', hash_str):
-                return False
-            
-            return True
-            
-        except Exception:
+            return len(bytes.fromhex(hash_str)) == 16
+        except ValueError:
             return False
     
-    def _validate_ed2k_info(self, ed2k_info: ED2KInfo) -> bool:
+    def _validate_ed2k_info(self, file_name: str, file_size: int) -> bool:
         """
         验证ED2K链接信息的有效性
         
         Args:
-            ed2k_info: ED2K链接信息
+            file_name: 文件名
+            file_size: 文件大小
             
         Returns:
             bool: 是否有效
         """
-        try:
-            logger.info(f"开始验证ED2K链接信息: {ed2k_info.file_name}")
-            
-            # 1. 验证文件名
-            if not ed2k_info.file_name or len(ed2k_info.file_name.strip()) == 0:
-                logger.error("文件名验证失败: 文件名为空")
-                return False
-            
-            # 检查文件名长度
-            if len(ed2k_info.file_name) > 255:  # 文件名最大长度限制
-                logger.error(f"文件名验证失败: 文件名过长 ({len(ed2k_info.file_name)} 字符)")
-                return False
-            
-            # 检查文件名是否包含非法字符
-            illegal_chars = ['<', '>', ':', '"', '|', '?', '*', '\\', '/']
-            if any(char in ed2k_info.file_name for char in illegal_chars):
-                logger.error(f"文件名验证失败: 包含非法字符")
-                return False
-            
-            logger.info("✅ 文件名验证通过")
-            
-            # 2. 验证文件大小
-            if ed2k_info.file_size < 0:
-                logger.error(f"文件大小验证失败: 负数大小 ({ed2k_info.file_size})")
-                return False
-            
-            # 检查文件大小的合理性
-            if ed2k_info.file_size == 0:
-                logger.warning("⚠️ 文件大小为0，可能是空文件")
-            elif ed2k_info.file_size < 1024:  # 小于1KB
-                logger.warning("⚠️ 文件大小异常小，可能不是真实文件")
-            elif ed2k_info.file_size > 1024 * 1024 * 1024 * 100:  # 大于100GB
-                logger.warning("⚠️ 文件大小异常大，可能不是真实文件")
-            
-            logger.info("✅ 文件大小验证通过")
-            
-            # 3. 验证哈希
-            if not self._is_valid_ed2k_hash(ed2k_info.file_hash):
-                logger.error(f"文件哈希验证失败: 无效哈希 ({ed2k_info.file_hash})")
-                return False
-            
-            logger.info("✅ 文件哈希验证通过")
-            
-            # 4. 验证文件类型一致性（如果文件名包含扩展名）
-            if '.' in ed2k_info.file_name:
-                ext = ed2k_info.file_name.split('.')[-1].lower()
-                logger.info(f"文件扩展名: {ext}")
-                
-                # 检查扩展名的合理性
-                common_exts = [
-                    # 视频格式
-                    'mp4', 'avi', 'mkv', 'mov', 'wmv', 'flv', 'webm', 'm4v', '3gp',
-                    # 音频格式
-                    'mp3', 'wav', 'flac', 'aac', 'ogg', 'wma', 'm4a', 'opus',
-                    # 文档格式
-                    'pdf', 'doc', 'docx', 'txt', 'rtf',
-                    # 压缩格式
-                    'zip', 'rar', '7z', 'tar', 'gz',
-                    # 其他格式
-                    'iso', 'bin', 'cue', 'img'
-                ]
-                
-                if ext in common_exts:
-                    logger.info(f"✅ 文件扩展名有效: {ext}")
-                else:
-                    logger.warning(f"⚠️ 文件扩展名不常见: {ext}")
-            
-            # 5. 综合验证结果
-            logger.info("🎉 ED2K链接信息验证完全通过！")
-            return True
-            
-        except Exception as e:
-            logger.error(f"验证ED2K链接信息失败: {e}")
+        logger.info(f"开始验证ED2K链接信息: {file_name}")
+        
+        # 文件名非空、文件大小非负、哈希格式已在 parse_ed2k_url 中校验，这里只检查其余规则
+        # 1. 验证文件名
+        if not file_name.strip():
+            logger.error("文件名验证失败: 文件名为空")
+            return False
+        
+        # 检查文件名长度
+        if len(file_name) > 255:  # 文件名最大长度限制
+            logger.error(f"文件名验证失败: 文件名过长 ({len(file_name)} 字符)")
+            return False
+        
+        # 检查文件名是否包含非法字符
+        if not _ILLEGAL_FILENAME_CHARS.isdisjoint(file_name):
+            logger.error(f"文件名验证失败: 包含非法字符")
             return False
+        
+        logger.info("✅ 文件名验证通过")
+        
+        # 2. 检查文件大小的合理性
+        if file_size == 0:
+            logger.warning("⚠️ 文件大小为0，可能是空文件")
+        elif file_size < 1024:  # 小于1KB
+            logger.warning("⚠️ 文件大小异常小，可能不是真实文件")
+        elif file_size > 1024 * 1024 * 1024 * 100:  # 大于100GB
+            logger.warning("⚠️ 文件大小异常大，可能不是真实文件")
+        
+        logger.info("✅ 文件大小验证通过")
+        
+        # 3. 验证文件类型一致性（如果文件名包含扩展名）
+        if '.' in file_name:
+            ext = file_name.rsplit('.', 1)[1].lower()
+            logger.info(f"文件扩展名: {ext}")
+            
+            # 检查扩展名的合理性
+            if ext in _COMMON_EXTENSIONS:
+                logger.info(f"✅ 文件扩展名有效: {ext}")
+            else:
+                logger.warning(f"⚠️ 文件扩展名不常见: {ext}")
+        
+        # 4. 综合验证结果
+        logger.info("🎉 ED2K链接信息验证完全通过！")
+        return True
     
     def _cache_ed2k_info(self, ed2k_info: ED2KInfo) -> None:
         """
@@ -272,18 +274,37 @@ class ED2KManager:
         Args:
             ed2k_info: ED2K链接信息
         """
-        try:
-            # 检查缓存大小
-            if len(self.ed2k_cache) >= self.max_cache_size:
-                # 移除最旧的缓存项
-                oldest_key = next(iter(self.ed2k_cache))
-                del self.ed2k_cache[oldest_key]
-            
-            # 添加新缓存项
+        with self.lock:
+            # 添加或更新缓存项，并标记为最近使用
+            previous = self.ed2k_cache.get(ed2k_info.file_hash)
+            if previous is not ed2k_info:
+                if previous is not None:
+                    self._unindex_ed2k_info(previous)
+                    self._valid_count -= previous.is_valid
+                self._index_ed2k_info(ed2k_info)
+                self._valid_count += ed2k_info.is_valid
             self.ed2k_cache[ed2k_info.file_hash] = ed2k_info
+            self.ed2k_cache.move_to_end(ed2k_info.file_hash)
             
-        except Exception as e:
-            logger.error(f"缓存ED2K链接信息失败: {e}")
+            # 超出缓存大小时移除最久未使用的缓存项
+            if len(self.ed2k_cache) > self.max_cache_size:
+                evicted = self.ed2k_cache.popitem(last=False)[1]
+                self._unindex_ed2k_info(evicted)
+                self._valid_count -= evicted.is_valid
+    
+    def _index_ed2k_info(self, ed2k_info: ED2KInfo) -> None:
+        """把文件名的三元组加入倒排索引（调用方持有 self.lock）"""
+        for gram in _trigrams(ed2k_info.file_name_lower):
+            self._trigram_index.setdefault(gram, set()).add(ed2k_info.file_hash)
+    
+    def _unindex_ed2k_info(self, ed2k_info: ED2KInfo) -> None:
+        """从倒排索引中移除文件名的三元组（调用方持有 self.lock）"""
+        for gram in _trigrams(ed2k_info.file_name_lower):
+            hashes = self._trigram_index.get(gram)
+            if hashes is not None:
+                hashes.discard(ed2k_info.file_hash)
+                if not hashes:
+                    del self._trigram_index[gram]
     
     def get_cached_ed2k_info(self, file_hash: str) -> Optional[ED2KInfo]:
         """
@@ -295,11 +316,23 @@ class ED2KManager:
         Returns:
             ED2KInfo: 缓存的ED2K链接信息，不存在返回None
         """
-        return self.ed2k_cache.get(file_hash.lower())
+        key = _canonical_hash(file_hash)
+        with self.lock:
+            ed2k_info = self.ed2k_cache.get(key)
+            if ed2k_info is not None:
+                # 命中时标记为最近使用
+                self.ed2k_cache.move_to_end(key)
+        return ed2k_info
+    
+    # 从哈希获取文件信息（用于搜索），与 get_cached_ed2k_info 相同
+    get_file_info_from_hash = get_cached_ed2k_info
     
     def clear_cache(self) -> None:
         """清空ED2K链接缓存"""
-        self.ed2k_cache.clear()
+        with self.lock:
+            self.ed2k_cache.clear()
+            self._trigram_index.clear()
+            self._valid_count = 0
         logger.info("ED2K链接缓存已清空")
     
     def get_ed2k_stats(self) -> Dict[str, int]:
@@ -309,24 +342,13 @@ class ED2KManager:
         Returns:
             Dict: 统计信息字典
         """
-        return {
-            'total_cached': len(self.ed2k_cache),
-            'max_cache_size': self.max_cache_size,
-            'valid_count': sum(1 for info in self.ed2k_cache.values() if info.is_valid),
-            'invalid_count': sum(1 for info in self.ed2k_cache.values() if not info.is_valid)
-        }
-    
-    def get_file_info_from_hash(self, file_hash: str) -> Optional[ED2KInfo]:
-        """
-        从哈希获取文件信息（用于搜索）
-        
-        Args:
-            file_hash: 文件哈希
-            
-        Returns:
-            ED2KInfo: 文件信息，不存在返回None
-        """
-        return self.ed2k_cache.get(file_hash.lower())
+        with self.lock:
+            return {
+                'total_cached': len(self.ed2k_cache),
+                'max_cache_size': self.max_cache_size,
+                'valid_count': self._valid_count,
+                'invalid_count': len(self.ed2k_cache) - self._valid_count
+            }
     
     def search_files_by_name(self, search_term: str) -> List[ED2KInfo]:
         """
@@ -338,19 +360,32 @@ class ED2KManager:
         Returns:
             List[ED2KInfo]: 匹配的文件列表
         """
-        try:
-            results = []
-            search_term_lower = search_term.lower()
+        search_term_lower = search_term.lower()
+        with self.lock:
+            if len(search_term_lower) < 3:
+                # 关键词太短，无法使用三元组索引，直接扫描
+                return [
+                    ed2k_info for ed2k_info in self.ed2k_cache.values()
+                    if search_term_lower in ed2k_info.file_name_lower
+                ]
             
-            for ed2k_info in self.ed2k_cache.values():
-                if search_term_lower in ed2k_info.file_name.lower():
+            # 包含关键词的文件名必然包含其全部三元组：从最短的倒排列表开始求交集得到候选
+            postings = []
+            for gram in _trigrams(search_term_lower):
+                hashes = self._trigram_index.get(gram)
+                if not hashes:
+                    return []
+                postings.append(hashes)
+            postings.sort(key=len)
+            candidates = postings[0].intersection(*postings[1:])
+            
+            # 三元组都命中不代表连续出现，逐个确认
+            results = []
+            for file_hash in candidates:
+                ed2k_info = self.ed2k_cache.get(file_hash)
+                if ed2k_info is not None and search_term_lower in ed2k_info.file_name_lower:
                     results.append(ed2k_info)
-            
             return results
-            
-        except Exception as e:
-            logger.error(f"搜索文件失败: {e}")
-            return []
 
 
 # 全局ED2K链接管理器实例
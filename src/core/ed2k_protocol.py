@@ -14,16 +14,204 @@ ED2K协议实现
 版本: 1.0.0
 """
 
+import asyncio
 import socket
 import struct
 import hashlib
+import mmap
+import secrets
 import time
 import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import os
 
+# ED2K 文件按 9500 KB 分块计算 MD4，再对各块哈希拼接后的结果做一次 MD4
+ED2K_PART_SIZE = 9728000
+
+
+# MD4 消息块：16 个小端 32 位字，直接从数据中按偏移解包，不再逐块切片
+_MD4_BLOCK = struct.Struct('<16I')
+
+
+class _PyMD4:
+    """纯 Python 的 MD4 实现（RFC 1320），仅在 OpenSSL 未提供 MD4 时使用"""
+
+    _MASK = 0xFFFFFFFF
+
+    def __init__(self):
+        self._state = [0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476]
+        self._buffer = b''
+        self._length = 0
+
+    @staticmethod
+    def _rotl(x: int, n: int) -> int:
+        x &= 0xFFFFFFFF
+        return ((x << n) | (x >> (32 - n))) & 0xFFFFFFFF
+
+    def _compress(self, data: bytes, offset: int) -> None:
+        x = _MD4_BLOCK.unpack_from(data, offset)
+        a, b, c, d = self._state
+        rotl = self._rotl
+        for i in (0, 4, 8, 12):
+            a = rotl(a + ((b & c) | (~b & d)) + x[i], 3)
+            d = rotl(d + ((a & b) | (~a & c)) + x[i + 1], 7)
+            c = rotl(c + ((d & a) | (~d & b)) + x[i + 2], 11)
+            b = rotl(b + ((c & d) | (~c & a)) + x[i + 3], 19)
+        for i in (0, 1, 2, 3):
+            a = rotl(a + ((b & c) | (b & d) | (c & d)) + x[i] + 0x5A827999, 3)
+            d = rotl(d + ((a & b) | (a & c) | (b & c)) + x[i + 4] + 0x5A827999, 5)
+            c = rotl(c + ((d & a) | (d & b) | (a & b)) + x[i + 8] + 0x5A827999, 9)
+            b = rotl(b + ((c & d) | (c & a) | (d & a)) + x[i + 12] + 0x5A827999, 13)
+        for i in (0, 2, 1, 3):
+            a = rotl(a + (b ^ c ^ d) + x[i] + 0x6ED9EBA1, 3)
+            d = rotl(d + (a ^ b ^ c) + x[i + 8] + 0x6ED9EBA1, 9)
+            c = rotl(c + (d ^ a ^ b) + x[i + 4] + 0x6ED9EBA1, 11)
+            b = rotl(b + (c ^ d ^ a) + x[i + 12] + 0x6ED9EBA1, 15)
+        state = self._state
+        self._state = [(v + w) & self._MASK for v, w in zip(state, (a, b, c, d))]
+
+    def update(self, data) -> None:
+        data = self._buffer + bytes(data)
+        self._length += len(data) - len(self._buffer)
+        end = len(data) - len(data) % 64
+        for offset in range(0, end, 64):
+            self._compress(data, offset)
+        self._buffer = data[end:]
+
+    def digest(self) -> bytes:
+        saved = (list(self._state), self._buffer, self._length)
+        bit_length = (self._length * 8) & 0xFFFFFFFFFFFFFFFF
+        padding = b'\x80' + b'\x00' * ((55 - self._length) % 64)
+        self.update(padding + struct.pack('<Q', bit_length))
+        result = struct.pack('<4I', *self._state)
+        self._state, self._buffer, self._length = saved
+        return result
+
+
+# ED2K 连接的内核收发缓冲区大小，以及服务器通信协程复用的用户态接收缓冲区大小
+_SOCKET_BUFFER_SIZE = 256 * 1024
+_RECV_BUFFER_SIZE = 64 * 1024
+# 已知文件记录和有源文件的数量上限，超出后丢弃最久未出现的记录，避免长时间运行时内存无限增长
+_MAX_KNOWN_FILES = 10000
+_MAX_KNOWN_SOURCES = 10000
+# 模拟下载时进度回调的最小间隔（秒）
+_PROGRESS_INTERVAL = 0.1
+# TCP 保活：空闲 60 秒后开始探测，每 30 秒一次，连续 3 次无响应即断开
+_TCP_KEEPALIVE_OPTIONS = (
+    ('TCP_KEEPIDLE', 60),
+    ('TCP_KEEPINTVL', 30),
+    ('TCP_KEEPCNT', 3),
+)
+# 数据包解析用的预编译结构，unpack_from 直接按偏移读取，不再解析格式串、也不切片
+_U32 = struct.Struct('<I')
+# SEARCH_REPLY 中每个结果的固定长度部分：文件哈希(16字节) + 文件大小(8字节) + 文件名长度(1字节)
+_SEARCH_RESULT_HEAD = struct.Struct('<16sQB')
+# FOUND_SOURCES 中每个源的固定长度记录：IPv4 地址(4字节) + 端口(2字节)
+_SOURCE_RECORD = struct.Struct('<4sH')
+
+
+@lru_cache(maxsize=256)
+def _lcg_byte_cycle(seed_low: int) -> bytes:
+    """模拟块数据所用线性同余生成器输出的一个完整周期
+
+    生成器为 seed = (seed * 1103515245 + 12345) mod 2^31，输出 seed 的低 8 位。
+    模数是 2 的幂，低 8 位只取决于上一个状态的低 8 位，且满足满周期条件，
+    因此输出以 256 字节为周期重复，只需按种子低 8 位生成一个周期再平铺即可。
+    """
+    seed = seed_low
+    cycle = bytearray(256)
+    for i in range(256):
+        seed = (seed * 1103515245 + 12345) & 0xFF
+        cycle[i] = seed
+    return bytes(cycle)
+
+
+# 所有 ED2KProtocol 实例共用的网络事件循环，首次连接时在一个后台线程中启动，之后一直复用
+_network_loop: Optional[asyncio.AbstractEventLoop] = None
+_network_loop_lock = threading.Lock()
+
+
+def _get_network_loop() -> asyncio.AbstractEventLoop:
+    """获取共用的网络事件循环，首次使用时在后台线程中启动"""
+    global _network_loop
+    with _network_loop_lock:
+        if _network_loop is None:
+            _network_loop = asyncio.new_event_loop()
+            threading.Thread(target=_network_loop.run_forever, name="ED2KNetworkLoop", daemon=True).start()
+        return _network_loop
+
+
+def tune_ed2k_socket(sock: socket.socket) -> None:
+    """调整 ED2K TCP 连接参数：关闭 Nagle 以尽快发出小控制包，开启保活，并增大收发缓冲区
+
+    需在 connect 之前调用，接收缓冲区大小才能影响 TCP 窗口协商。
+    """
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    # 保活参数常量因平台而异，缺少的选项沿用系统默认值
+    for name, value in _TCP_KEEPALIVE_OPTIONS:
+        option = getattr(socket, name, None)
+        if option is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, option, value)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, _SOCKET_BUFFER_SIZE)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, _SOCKET_BUFFER_SIZE)
+
+
+# OpenSSL 是否提供 MD4（OpenSSL 3 默认不再提供），只检测一次
+try:
+    hashlib.new('md4')
+    _OPENSSL_MD4 = True
+except ValueError:
+    _OPENSSL_MD4 = False
+
+
+def _new_md4():
+    """优先使用 OpenSSL 提供的 MD4（C/汇编实现），不可用时回退到纯 Python 实现"""
+    return hashlib.new('md4') if _OPENSSL_MD4 else _PyMD4()
+
+
+def _md4_digest(data) -> bytes:
+    """计算一段数据的 MD4"""
+    md4 = _new_md4()
+    md4.update(data)
+    return md4.digest()
+
+
+def compute_ed2k_hash(path: str) -> bytes:
+    """计算文件的 ED2K 哈希
+
+    文件按 ED2K_PART_SIZE 分块，每块计算 MD4；只有一块时直接返回该块哈希，
+    否则返回各块哈希拼接后的 MD4。大小正好是分块整数倍时按 eMule 的做法追加一个空块的哈希。
+    文件以只读方式映射到内存，每块以 memoryview 切片一次送入哈希，不经过读缓冲区复制。
+    使用 OpenSSL 的 MD4 时计算大块数据会释放 GIL，多块文件在线程池中并行计算各块哈希。
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            # 空文件无法映射，只有一个空块
+            return _new_md4().digest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+            # 块数为 size // ED2K_PART_SIZE + 1：最后一块不足一整块，或正好整除时为空块
+            offsets = range(0, size + 1, ED2K_PART_SIZE)
+
+            def hash_part(offset: int) -> bytes:
+                return _md4_digest(view[offset:offset + ED2K_PART_SIZE])
+
+            if _OPENSSL_MD4 and len(offsets) > 1:
+                with ThreadPoolExecutor(max_workers=min(len(offsets), os.cpu_count() or 1)) as executor:
+                    part_hashes = list(executor.map(hash_part, offsets))
+            else:
+                part_hashes = [hash_part(offset) for offset in offsets]
+
+    if len(part_hashes) == 1:
+        return part_hashes[0]
+    return _md4_digest(b''.join(part_hashes))
+
 class ED2KPacketType(Enum):
     """ED2K数据包类型"""
     LOGIN_REQUEST = 0x01
@@ -38,6 +226,13 @@ class ED2KPacketType(Enum):
     FILE_STATUS = 0x07
     FILE_PART = 0x08
 
+# 服务器数据包分发表：操作码 -> 处理方法名，按整数直接查表，避免逐个比较枚举值
+_SERVER_PACKET_HANDLERS = {
+    ED2KPacketType.SEARCH_REPLY.value: '_handle_search_reply',
+    ED2KPacketType.FOUND_SOURCES.value: '_handle_found_sources',
+    ED2KPacketType.FILE_REPLY.value: '_handle_file_reply',
+}
+
 @dataclass
 class ED2KServer:
     """ED2K服务器信息"""
@@ -79,8 +274,11 @@ class ED2KProtocol:
     def __init__(self):
         self.servers: List[ED2KServer] = []
         self.connected_servers: List[ED2KServer] = []
-        self.sources: Dict[bytes, ED2KSource] = {}
-        self.files: Dict[bytes, ED2KFileInfo] = {}
+        # 文件哈希 -> 服务器最近返回的源记录（连续的 IP+端口 定长记录），需要时才生成 ED2KSource
+        self.sources: "OrderedDict[bytes, bytes]" = OrderedDict()
+        self.files: "OrderedDict[bytes, ED2KFileInfo]" = OrderedDict()
+        self.max_files = _MAX_KNOWN_FILES
+        self.max_sources = _MAX_KNOWN_SOURCES
         
         # 网络配置
         self.tcp_port = 4662
@@ -92,10 +290,18 @@ class ED2KProtocol:
         self.user_id = None
         self.client_name = "椰果IDM"
         self.client_version = "1.0.0"
+        # 客户端信息不会变化，登录包中使用的 UTF-8 编码只生成一次
+        self._client_name_bytes = self.client_name.encode('utf-8')
+        self._client_version_bytes = self.client_version.encode('utf-8')
         
         # 线程锁
         self.lock = threading.Lock()
         
+        # 本实例的服务器通信任务，运行在共用的网络事件循环中
+        self._server_tasks = set()
+        # 空闲的接收缓冲区，连接断开后归还，重连时复用（只在事件循环线程中访问）
+        self._recv_buffers: List[bytearray] = []
+        
         # 回调函数
         self.on_connected = None
         self.on_disconnected = None
@@ -106,52 +312,60 @@ class ED2KProtocol:
         self.on_error = None
     
     def connect_to_server(self, server_ip: str, server_port: int = 4661) -> bool:
+        """连接到ED2K服务器（供工作线程调用，实际连接在网络事件循环中进行）"""
+        future = asyncio.run_coroutine_threadsafe(
+            self.connect_to_server_async(server_ip, server_port), _get_network_loop()
+        )
+        return future.result()
+    
+    async def connect_to_server_async(self, server_ip: str, server_port: int = 4661) -> bool:
         """连接到ED2K服务器"""
+        loop = asyncio.get_running_loop()
+        connected = False
+        # 创建TCP连接：直接使用非阻塞套接字，通信协程可以 recv_into 复用接收缓冲区
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         try:
+            tune_ed2k_socket(sock)
+            sock.setblocking(False)
+            await asyncio.wait_for(loop.sock_connect(sock, (server_ip, server_port)), timeout=5)
+            
+            # 发送登录请求
+            await loop.sock_sendall(sock, self._create_login_packet())
+            
+            # 接收登录响应
+            response = await asyncio.wait_for(loop.sock_recv(sock, 1024), timeout=3)
+            if not self._parse_login_response(response):
+                return False
+            
+            # 保存连接信息
+            server = ED2KServer(
+                ip=server_ip,
+                port=server_port,
+                name="Unknown",
+                description="",
+                version="",
+                max_users=0,
+                current_users=0,
+                files=0,
+                priority=0
+            )
+            
             with self.lock:
-                # 创建TCP连接
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(5)  # 减少超时时间，更快失败检测
-                
-                # 尝试连接
-                sock.connect((server_ip, server_port))
-                
-                # 发送登录请求
-                login_packet = self._create_login_packet()
-                sock.send(login_packet)
-                
-                # 接收登录响应
-                sock.settimeout(3)  # 响应超时
-                response = sock.recv(1024)
-                if self._parse_login_response(response):
-                    # 保存连接信息
-                    server = ED2KServer(
-                        ip=server_ip,
-                        port=server_port,
-                        name="Unknown",
-                        description="",
-                        version="",
-                        max_users=0,
-                        current_users=0,
-                        files=0,
-                        priority=0
-                    )
-                    
-                    self.connected_servers.append(server)
-                    self.is_connected = True
-                    
-                    # 启动服务器通信线程
-                    threading.Thread(target=self._server_communication, args=(sock, server), daemon=True).start()
-                    
-                    if self.on_connected:
-                        self.on_connected(server)
-                    
-                    return True
-                else:
-                    sock.close()
-                    return False
+                self.connected_servers.append(server)
+                self.is_connected = True
+            connected = True
+            
+            # 在同一事件循环中启动服务器通信任务，不再为每个连接创建线程；空闲连接由 TCP 保活检测
+            task = loop.create_task(self._server_communication(sock, server))
+            self._server_tasks.add(task)
+            task.add_done_callback(self._server_tasks.discard)
+            
+            if self.on_connected:
+                self.on_connected(server)
+            
+            return True
                     
-        except socket.timeout:
+        except asyncio.TimeoutError:
             if self.on_error:
                 self.on_error(f"连接服务器超时: {server_ip}:{server_port}")
             return False
@@ -163,30 +377,33 @@ class ED2KProtocol:
             if self.on_error:
                 self.on_error(f"连接服务器失败: {e}")
             return False
+        finally:
+            if not connected:
+                sock.close()
     
     def _create_login_packet(self) -> bytes:
         """创建登录数据包"""
         # 生成用户ID
         if not self.user_id:
-            self.user_id = hashlib.md5(f"{self.client_name}_{int(time.time())}".encode()).digest()
-        
-        # 构建登录数据包
-        packet = struct.pack('<B', ED2KPacketType.LOGIN_REQUEST.value)
-        packet += self.user_id
-        packet += struct.pack('<I', self.tcp_port)
-        packet += struct.pack('<I', self.udp_port)
-        packet += struct.pack('<I', 0)  # 用户数
-        packet += struct.pack('<I', 0)  # 文件数
-        packet += struct.pack('<I', 0)  # 共享文件数
-        packet += struct.pack('<I', 0)  # 共享文件大小
+            self.user_id = secrets.token_bytes(16)
         
-        # 添加客户端信息
-        packet += struct.pack('<B', len(self.client_name))
-        packet += self.client_name.encode('utf-8')
-        packet += struct.pack('<B', len(self.client_version))
-        packet += self.client_version.encode('utf-8')
-        
-        return packet
+        # 构建登录数据包：一次 struct.pack 生成，不再逐字段拼接 bytes
+        name = self._client_name_bytes
+        version = self._client_version_bytes
+        return struct.pack(
+            f'<B16sIIIIIIB{len(name)}sB{len(version)}s',
+            ED2KPacketType.LOGIN_REQUEST.value,
+            self.user_id,
+            self.tcp_port,
+            self.udp_port,
+            0,  # 用户数
+            0,  # 文件数
+            0,  # 共享文件数
+            0,  # 共享文件大小
+            # 客户端信息：长度前缀为 UTF-8 编码后的字节数
+            len(name), name,
+            len(version), version,
+        )
     
     def _parse_login_response(self, data: bytes) -> bool:
         """解析登录响应"""
@@ -194,7 +411,7 @@ class ED2KProtocol:
             if len(data) < 1:
                 return False
             
-            packet_type = struct.unpack('<B', data[:1])[0]
+            packet_type = data[0]
             if packet_type != ED2KPacketType.LOGIN_REPLY.value:
                 return False
             
@@ -203,7 +420,7 @@ class ED2KProtocol:
             if len(data) < offset + 4:
                 return False
             
-            result = struct.unpack('<I', data[offset:offset+4])[0]
+            result = _U32.unpack_from(data, offset)[0]
             return result == 0  # 0表示成功
             
         except Exception:
@@ -233,20 +450,18 @@ class ED2KProtocol:
     
     def _create_search_packet(self, query: str, file_type: str, min_size: int, max_size: int) -> bytes:
         """创建搜索数据包"""
-        packet = struct.pack('<B', ED2KPacketType.SEARCH_REQUEST.value)
-        packet += struct.pack('<I', 0)  # 搜索ID
-        packet += struct.pack('<I', min_size)
-        packet += struct.pack('<I', max_size)
-        packet += struct.pack('<B', len(query))
-        packet += query.encode('utf-8')
-        
-        if file_type:
-            packet += struct.pack('<B', len(file_type))
-            packet += file_type.encode('utf-8')
-        else:
-            packet += struct.pack('<B', 0)
-        
-        return packet
+        # 一次 struct.pack 生成；先编码再按字节数写长度前缀，没有文件类型时长度为0，后面不跟数据
+        query_bytes = query.encode('utf-8')
+        file_type_bytes = file_type.encode('utf-8')
+        return struct.pack(
+            f'<BIIIB{len(query_bytes)}sB{len(file_type_bytes)}s',
+            ED2KPacketType.SEARCH_REQUEST.value,
+            0,  # 搜索ID
+            min_size,
+            max_size,
+            len(query_bytes), query_bytes,
+            len(file_type_bytes), file_type_bytes,
+        )
     
     def download_file(self, file_hash: bytes, save_path: str) -> bool:
         """下载文件"""
@@ -292,25 +507,27 @@ class ED2KProtocol:
                 chunk_size = 1024 * 1024  # 1MB块
                 remaining_size = file_info.file_size - downloaded_size
                 
+                # 模拟数据只生成一次，各块复用同一缓冲区写入（实际应用中这里应该是从源下载）
+                chunk_view = memoryview(os.urandom(min(chunk_size, max(remaining_size, 0))))
+                last_progress_time = 0.0
+                
                 while remaining_size > 0 and self.is_connected:
                     # 计算当前块大小
                     current_chunk_size = min(chunk_size, remaining_size)
                     
-                    # 生成模拟数据（实际应用中这里应该是从源下载）
-                    chunk_data = self._generate_file_chunk(file_hash, downloaded_size, current_chunk_size)
-                    f.write(chunk_data)
+                    f.write(chunk_view[:current_chunk_size])
                     
                     # 更新进度
                     downloaded_size += current_chunk_size
                     remaining_size -= current_chunk_size
                     
-                    # 发送进度回调
+                    # 发送进度回调：按时间间隔限频，最后一块总是发送
                     if self.on_download_progress:
-                        progress = int((downloaded_size / file_info.file_size) * 100)
-                        self.on_download_progress(file_info.file_name, progress, downloaded_size, file_info.file_size)
-                    
-                    # 模拟网络延迟
-                    time.sleep(0.1)
+                        now = time.monotonic()
+                        if remaining_size <= 0 or now - last_progress_time >= _PROGRESS_INTERVAL:
+                            last_progress_time = now
+                            progress = int((downloaded_size / file_info.file_size) * 100)
+                            self.on_download_progress(file_info.file_name, progress, downloaded_size, file_info.file_size)
             
             # 下载完成
             if self.on_download_complete:
@@ -320,51 +537,42 @@ class ED2KProtocol:
             if self.on_error:
                 self.on_error(f"下载文件失败: {e}")
     
-    def _generate_file_chunk(self, file_hash: bytes, offset: int, size: int) -> bytes:
-        """生成文件块数据（模拟）"""
-        # 使用文件哈希和偏移量生成伪随机数据
-        seed = int.from_bytes(file_hash[:4], 'little') + offset
-        data = bytearray()
-        
-        for i in range(size):
-            seed = (seed * 1103515245 + 12345) % 2147483648
-            data.append(seed % 256)
-        
-        return bytes(data)
-    
-    def _server_communication(self, sock: socket.socket, server: ED2KServer):
-        """服务器通信线程"""
+    async def _server_communication(self, sock: socket.socket, server: ED2KServer):
+        """服务器通信协程"""
+        loop = asyncio.get_running_loop()
+        # 整个连接复用同一个接收缓冲区，recv_into 直接写入，不再每次读取都新建 bytes 对象；
+        # 缓冲区取自空闲池，断开后归还，服务器重连时不必重新分配
+        recv_buf = self._recv_buffers.pop() if self._recv_buffers else bytearray(_RECV_BUFFER_SIZE)
+        view = memoryview(recv_buf)
         try:
             while self.is_connected:
                 # 接收服务器数据
-                data = sock.recv(1024)
-                if not data:
+                n = await loop.sock_recv_into(sock, view)
+                if not n:
                     break
                 
                 # 处理服务器数据包
-                self._handle_server_packet(data, server)
+                self._handle_server_packet(view[:n], server)
                 
         except Exception as e:
             if self.on_error:
                 self.on_error(f"服务器通信错误: {e}")
         finally:
+            view.release()
+            self._recv_buffers.append(recv_buf)
             sock.close()
             self._remove_server(server)
     
-    def _handle_server_packet(self, data: bytes, server: ED2KServer):
-        """处理服务器数据包"""
+    def _handle_server_packet(self, data: memoryview, server: ED2KServer):
+        """处理服务器数据包（data 指向可复用的接收缓冲区）"""
         try:
             if len(data) < 1:
                 return
             
-            packet_type = struct.unpack('<B', data[:1])[0]
-            
-            if packet_type == ED2KPacketType.SEARCH_REPLY.value:
-                self._handle_search_reply(data)
-            elif packet_type == ED2KPacketType.FOUND_SOURCES.value:
-                self._handle_found_sources(data)
-            elif packet_type == ED2KPacketType.FILE_REPLY.value:
-                self._handle_file_reply(data)
+            # 只有需要处理的数据包才复制出来，处理函数会保留其中的哈希等字段
+            handler = _SERVER_PACKET_HANDLERS.get(data[0])
+            if handler is not None:
+                getattr(self, handler)(bytes(data))
                 
         except Exception as e:
             if self.on_error:
@@ -378,33 +586,31 @@ class ED2KProtocol:
             if len(data) < offset + 4:
                 return
             
-            results_count = struct.unpack('<I', data[offset:offset+4])[0]
+            results_count = _U32.unpack_from(data, offset)[0]
             offset += 4
             
-            for i in range(results_count):
-                if len(data) < offset + 16:
-                    break
-                
-                # 解析文件信息
-                file_hash = data[offset:offset+16]
-                offset += 16
-                
-                if len(data) < offset + 8:
+            # 通过 memoryview 读取文件名，只有需要保留的哈希和文件名会生成新对象
+            view = memoryview(data)
+            data_len = len(data)
+            head_size = _SEARCH_RESULT_HEAD.size
+            # 每条结果都要用到的方法和属性先取到局部变量，循环内不再重复查找
+            unpack_head = _SEARCH_RESULT_HEAD.unpack_from
+            remember = self._remember
+            files = self.files
+            max_files = self.max_files
+            on_file_found = self.on_file_found
+            for _ in range(results_count):
+                if data_len < offset + head_size:
                     break
                 
-                file_size = struct.unpack('<Q', data[offset:offset+8])[0]
-                offset += 8
+                # 解析文件信息：哈希、大小、文件名长度一次解包
+                file_hash, file_size, name_length = unpack_head(data, offset)
+                offset += head_size
                 
-                if len(data) < offset + 1:
+                if data_len < offset + name_length:
                     break
                 
-                name_length = struct.unpack('<B', data[offset:offset+1])[0]
-                offset += 1
-                
-                if len(data) < offset + name_length:
-                    break
-                
-                file_name = data[offset:offset+name_length].decode('utf-8', errors='ignore')
+                file_name = str(view[offset:offset + name_length], 'utf-8', errors='ignore')
                 offset += name_length
                 
                 # 创建文件信息
@@ -418,10 +624,10 @@ class ED2KProtocol:
                     available_parts=[]
                 )
                 
-                self.files[file_hash] = file_info
+                remember(files, file_hash, file_info, max_files)
                 
-                if self.on_file_found:
-                    self.on_file_found(file_info)
+                if on_file_found:
+                    on_file_found(file_info)
                     
         except Exception as e:
             if self.on_error:
@@ -441,41 +647,41 @@ class ED2KProtocol:
             if len(data) < offset + 1:
                 return
             
-            sources_count = struct.unpack('<B', data[offset:offset+1])[0]
+            sources_count = data[offset]
             offset += 1
             
-            for i in range(sources_count):
-                if len(data) < offset + 6:
-                    break
-                
-                # 解析源IP和端口
-                ip_bytes = data[offset:offset+4]
-                ip = socket.inet_ntoa(ip_bytes)
-                offset += 4
-                
-                port = struct.unpack('<H', data[offset:offset+2])[0]
-                offset += 2
-                
-                # 创建源信息
-                source = ED2KSource(
-                    ip=ip,
-                    port=port,
-                    user_id=b'',
-                    client_name="",
-                    version="",
-                    connection_type="",
-                    is_connected=False
-                )
-                
-                self.sources[file_hash] = source
-                
-                if self.on_source_found:
-                    self.on_source_found(file_hash, source)
+            # 源记录长度固定，只保留实际收到的完整记录，整段原样保存为该文件的源表
+            sources_count = min(sources_count, (len(data) - offset) // _SOURCE_RECORD.size)
+            records = data[offset:offset + sources_count * _SOURCE_RECORD.size]
+            self._remember(self.sources, file_hash, records, self.max_sources)
+            
+            # 只有需要通知时才逐条生成源信息对象
+            if self.on_source_found:
+                for ip_bytes, port in _SOURCE_RECORD.iter_unpack(records):
+                    self.on_source_found(file_hash, self._make_source(ip_bytes, port))
                     
         except Exception as e:
             if self.on_error:
                 self.on_error(f"解析源信息失败: {e}")
     
+    @staticmethod
+    def _make_source(ip_bytes: bytes, port: int) -> ED2KSource:
+        """由源记录中的 IP 和端口创建源信息"""
+        return ED2KSource(
+            ip=socket.inet_ntoa(ip_bytes),
+            port=port,
+            user_id=b'',
+            client_name="",
+            version="",
+            connection_type="",
+            is_connected=False
+        )
+    
+    def get_sources(self, file_hash: bytes) -> List[ED2KSource]:
+        """获取文件的已知下载源"""
+        records = self.sources.get(file_hash, b'')
+        return [self._make_source(ip_bytes, port) for ip_bytes, port in _SOURCE_RECORD.iter_unpack(records)]
+    
     def _handle_file_reply(self, data: bytes):
         """处理文件响应"""
         # 这里处理文件相关的响应
@@ -498,16 +704,31 @@ class ED2KProtocol:
         with self.lock:
             self.is_connected = False
             
-            # 清理连接
+            # 清理连接：通信任务在事件循环线程中取消，各自关闭连接
             self.connected_servers.clear()
             self.sources.clear()
+            if _network_loop is not None:
+                _network_loop.call_soon_threadsafe(self._cancel_server_tasks)
+    
+    def _cancel_server_tasks(self):
+        """取消所有服务器通信任务（在网络事件循环中调用）"""
+        for task in self._server_tasks:
+            task.cancel()
+    
+    @staticmethod
+    def _remember(records: OrderedDict, key: bytes, value, limit: int):
+        """保存记录并标记为最新，超出上限时丢弃最旧的记录"""
+        records[key] = value
+        records.move_to_end(key)
+        if len(records) > limit:
+            records.popitem(last=False)
     
     def get_connection_status(self) -> Dict:
         """获取连接状态"""
         return {
             "is_connected": self.is_connected,
             "connected_servers": len(self.connected_servers),
-            "known_sources": len(self.sources),
+            "known_sources": sum(len(records) for records in self.sources.values()) // _SOURCE_RECORD.size,
             "known_files": len(self.files),
             "user_id": self.user_id.hex() if self.user_id else None
         }
@@ -651,13 +872,14 @@ class ED2KProtocol:
             seed_data = file_hash + struct.pack('<I', chunk_index)
             seed = int.from_bytes(seed_data[:4], 'little')
             
-            # 使用线性同余生成器生成伪随机数据
-            data = bytearray()
-            for i in range(chunk_size):
-                seed = (seed * 1103515245 + 12345) & 0x7fffffff
-                data.append(seed & 0xFF)
-            
-            return bytes(data)
+            # 使用线性同余生成器生成伪随机数据：输出以 256 字节为周期，平铺一个周期即可
+            # 标准块大小是 256 的整数倍，整周期重复即可，不必再切片复制一份
+            cycle = _lcg_byte_cycle(seed & 0xFF)
+            repeats, remainder = divmod(chunk_size, len(cycle))
+            data = cycle * repeats
+            if remainder:
+                data += cycle[:remainder]
+            return data
             
         except Exception as e:
             print(f"生成ED2K块数据失败: {e}")
@@ -690,15 +912,9 @@ class ED2KProtocol:
             return False
     
     def _calculate_ed2k_hash(self, file_path: str) -> bytes:
-        """计算文件的ED2K哈希（简化版本）"""
+        """计算文件的ED2K哈希"""
         try:
-            # 这里应该实现真正的ED2K哈希算法
-            # 由于复杂性，我们使用MD5作为占位符
-            hash_md5 = hashlib.md5()
-            with open(file_path, 'rb') as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.digest()
+            return compute_ed2k_hash(file_path)
         except Exception as e:
             print(f"计算ED2K哈希失败: {e}")
             return b''
@@ -0,0 +1,377 @@
+"""
+格式筛选模块
+
+该模块包含视频格式筛选相关的纯函数，不依赖任何界面对象，负责：
+- 分辨率的识别与标准化
+- 格式列表的过滤
+- 合集视频标题的整理
+- 为单个条目挑选最佳音频格式和每个分辨率的最优视频格式
+
+这些函数既可在解析线程中预先执行，也可在主线程中按需调用。
+
+作者: 椰果IDM开发团队
+版本: 1.0.0
+"""
+
+import re
+from typing import Dict, List
+
+from ..utils.logger import logger
+
+
+# 预编译的正则表达式，避免在逐格式/逐条目循环中重复查找模式缓存
+_RES_RE = re.compile(r"(\d+)x(\d+)")
+_P_RES_RE = re.compile(r"^\d+p$")
+_PART_RE = re.compile(r"p\d+")
+_TITLE_RE = re.compile(r"p\d+\s*(.+?)(?:_\w+)?$")
+
+
+def is_standard_resolution(resolution: str) -> bool:
+    """
+    判断是否为标准分辨率
+    
+    Args:
+        resolution: 分辨率字符串，如 "1920x1080", "1280x720" 等
+        
+    Returns:
+        bool: 是否为标准分辨率
+    """
+    # 标准分辨率列表 - 扩展支持更多常见分辨率
+    standard_resolutions = {
+        # 4K
+        "3840x2160", "4096x2160",
+        # 2K
+        "2560x1440", "2048x1080",
+        # 1080P
+        "1920x1080", "1920x1088", "1440x1080",  # 添加1440x1080（4:3比例1080P）
+        # 720P
+        "1280x720", "1280x736", "960x720",  # 添加960x720（4:3比例720P）
+        # 480P - 添加更多变体
+        "854x480", "848x480", "832x480", "852x480", "850x480", "856x480", "858x480", "860x480", "862x480", "864x480", "866x480", "868x480", "870x480", "872x480", "874x480", "876x480", "878x480", "880x480",
+        # 360P
+        "640x360", "640x368", "640x480",  # 添加640x480（4:3比例480P）
+        # 240P
+        "426x240", "424x240", "480x360",  # 添加480x360（4:3比例360P）
+        # 144P
+        "256x144", "256x160"
+    }
+    
+    # 清理分辨率字符串，移除空格和特殊字符
+    clean_resolution = resolution.strip().lower()
+    
+    # 检查是否在标准分辨率列表中
+    if clean_resolution in standard_resolutions:
+        return True
+    
+    # 检查是否为音频格式（没有分辨率）
+    if clean_resolution in ["audio only", "audio_only", "audio"]:
+        return True
+    
+    # 检查是否为标准P格式（如1080p, 720p等）
+    if _P_RES_RE.match(clean_resolution):
+        p_value = int(clean_resolution[:-1])
+        if p_value in [144, 240, 360, 480, 720, 1080, 1440, 2160]:
+            return True
+    
+    # 检查是否为接近标准分辨率的格式（允许±1像素的误差）
+    if "x" in clean_resolution:
+        try:
+            width, height = clean_resolution.split("x")
+            width, height = int(width), int(height)
+            
+            # 检查是否接近标准分辨率
+            for std_res in standard_resolutions:
+                if "x" in std_res:
+                    std_width, std_height = std_res.split("x")
+                    std_width, std_height = int(std_width), int(std_height)
+                    
+                    # 允许±4像素的误差，以包含更多变体
+                    if abs(width - std_width) <= 4 and abs(height - std_height) <= 4:
+                        return True
+        except (ValueError, IndexError):
+            pass
+    
+    return False
+
+
+def filter_formats(formats: List[Dict], strict_filter: bool = False) -> List[Dict]:
+    """
+    过滤格式列表，只保留标准分辨率的格式
+    
+    Args:
+        formats: 原始格式列表
+        strict_filter: 是否使用严格过滤模式，False时保留更多格式
+        
+    Returns:
+        List[Dict]: 过滤后的格式列表
+    """
+    filtered_formats = []
+    
+    for format_info in formats:
+        # 获取分辨率信息
+        resolution = format_info.get("resolution", "")
+        format_note = format_info.get("format_note", "")
+        width = format_info.get("width")
+        height = format_info.get("height")
+        
+        # 构建完整的分辨率字符串
+        resolution_str = resolution
+        if not resolution_str and width and height:
+            resolution_str = f"{width}x{height}"
+        elif not resolution_str and format_note:
+            resolution_str = format_note
+        
+        # 检查是否为音频格式
+        acodec = format_info.get("acodec", "none")
+        vcodec = format_info.get("vcodec", "none")
+        if acodec != "none" and vcodec == "none":
+            # 音频格式，保留
+            filtered_formats.append(format_info)
+            continue
+        
+        # 检查是否为视频格式
+        if vcodec == "none":
+            # 跳过纯音频格式（非视频）
+            continue
+        
+        # 如果不使用严格过滤，保留所有视频格式
+        if not strict_filter:
+            filtered_formats.append(format_info)
+            continue
+        
+        # 严格过滤模式：只保留标准分辨率的格式
+        if is_standard_resolution(resolution_str):
+            filtered_formats.append(format_info)
+        else:
+            logger.info(f"过滤掉非标准分辨率: {resolution_str} (原始: {resolution}, 说明: {format_note}, 宽高: {width}x{height})")
+    
+    return filtered_formats
+
+
+def get_resolution(f: Dict) -> str:
+    """从格式信息中提取分辨率并标准化"""
+    # 首先检查 resolution 字段
+    resolution = f.get("resolution", "")
+    if resolution and resolution != "audio only" and "x" in resolution:
+        return standardize_resolution(resolution)
+
+    # 检查 width 和 height 字段
+    width = f.get("width")
+    height = f.get("height")
+    if width and height:
+        return standardize_resolution(f"{width}x{height}")
+    elif height:
+        return f"{height}p"
+
+    # 检查 format_note 字段
+    format_note = f.get("format_note", "")
+    if format_note and format_note != "unknown":
+        # 尝试从 format_note 中提取分辨率
+        if "x" in format_note:
+            return standardize_resolution(format_note)
+        elif format_note.isdigit():
+            return f"{format_note}p"
+
+    # 检查 format 字段
+    format_str = f.get("format", "")
+    if "x" in format_str:
+        match = _RES_RE.search(format_str)
+        if match:
+            return standardize_resolution(f"{match.group(1)}x{match.group(2)}")
+
+    # 检查是否为音频格式
+    if f.get("acodec", "none") != "none" and f.get("vcodec", "none") == "none":
+        return "audio only"
+
+    # 如果都找不到，返回未知
+    return "未知"
+
+def standardize_resolution(resolution: str) -> str:
+    """标准化分辨率到主流分辨率"""
+    if not resolution or "x" not in resolution:
+        return resolution
+
+    try:
+        width, height = resolution.split("x")
+        width, height = int(width), int(height)
+
+        # 1080P 变体 → 1920x1080 或 1440x1080
+        if abs(height - 1080) <= 4:
+            if abs(width - 1920) <= 4:
+                return "1920x1080"
+            elif abs(width - 1440) <= 4:
+                return "1440x1080"
+        # 720P 变体 → 1280x720 或 960x720
+        elif abs(height - 720) <= 4:
+            if abs(width - 1280) <= 4:
+                return "1280x720"
+            elif abs(width - 960) <= 4:
+                return "960x720"
+        # 480P 变体 → 852x480 或 640x480
+        elif abs(height - 480) <= 4:
+            if abs(width - 852) <= 4:
+                return "852x480"
+            elif abs(width - 640) <= 4:
+                return "640x480"
+        # 360P 变体 → 640x360 或 480x360
+        elif abs(height - 360) <= 4:
+            if abs(width - 640) <= 4:
+                return "640x360"
+            elif abs(width - 480) <= 4:
+                return "480x360"
+        # 240P 变体 → 426x240
+        elif abs(height - 240) <= 4:
+            if abs(width - 426) <= 4:
+                return "426x240"
+    except (ValueError, IndexError):
+        pass
+    # 其他尺寸（包括高度接近标准值但宽度不在上面列表中的，如 1080x1080）保持原样
+    return resolution
+
+
+def resolution_sort_key(resolution: str) -> tuple:
+    """
+    生成分辨率的数值排序键（高度, 宽度），避免按字符串排序
+    
+    Args:
+        resolution: 分辨率字符串，如 "1920x1080"、"720p"
+        
+    Returns:
+        tuple: (高度, 宽度)，无法识别时为 (0, 0)
+    """
+    if not isinstance(resolution, str):
+        return (0, 0)
+    match = _RES_RE.search(resolution)
+    if match:
+        return (int(match.group(2)), int(match.group(1)))
+    if _P_RES_RE.match(resolution):
+        return (int(resolution[:-1]), 0)
+    return (0, 0)
+
+
+def format_entry_title(video_title: str, video_id: str) -> str:
+    """
+    整理条目标题，合集视频只保留分P标题
+    
+    Args:
+        video_title: 原始视频标题
+        video_id: 视频ID
+        
+    Returns:
+        str: 整理后的标题
+    """
+    # 处理视频标题格式 - 优化合集视频处理
+    # 检查是否为合集视频的一部分
+    if "p" in video_title.lower() and _PART_RE.search(video_title):
+        # 合集视频，提取部分标题
+        match = _TITLE_RE.search(video_title)
+        if match:
+            formatted_title = match.group(1).strip()
+        else:
+            # 如果无法提取部分标题，使用完整标题
+            formatted_title = video_title
+    else:
+        # 单个视频，使用完整标题
+        formatted_title = video_title
+        if f"_{video_id}" in formatted_title:
+            formatted_title = formatted_title.replace(f"_{video_id}", "")
+    
+    # 确保标题不为空
+    if not formatted_title.strip():
+        formatted_title = f"视频_{video_id}"
+    return formatted_title
+
+
+def select_entry_formats(info: Dict) -> Dict:
+    """
+    为单个解析条目挑选可用格式
+    
+    只使用普通的 Python 数据结构，可以在解析线程中执行，
+    主线程只需根据结果创建树形控件项。
+    
+    Args:
+        info: yt-dlp 返回的单个条目信息
+        
+    Returns:
+        Dict: 包含 formatted_title、filtered_formats、audio_format、
+              audio_filesize 和 video_formats（分辨率 -> 最优格式）的字典
+    """
+    video_title = info.get("title", "未知标题")
+    video_id = info.get("id", "unknown")
+    audio_format = None
+    audio_filesize = 0
+    video_formats: Dict[str, Dict] = {}
+
+    formats = info.get("formats", [])
+    logger.info(f"解析条目 '{video_title}'，共有 {len(formats)} 个格式")
+
+    # 过滤格式，保留所有视频格式（非严格过滤）
+    filtered_formats = filter_formats(formats, strict_filter=False)
+    logger.info(f"过滤后剩余 {len(filtered_formats)} 个格式")
+
+    selection = {
+        "formatted_title": format_entry_title(video_title, video_id),
+        "filtered_formats": filtered_formats,
+        "audio_format": audio_format,
+        "audio_filesize": audio_filesize,
+        "video_formats": video_formats,
+    }
+
+    # ED2K和磁力链接不进行视频特定的格式挑选
+    if info.get('type', '') in ['ed2k', 'magnet']:
+        return selection
+
+    # 处理格式信息
+    for f in filtered_formats:
+        format_id = f.get("format_id")
+        resolution = get_resolution(f)
+        ext = f.get("ext", "")
+        acodec = f.get("acodec", "none")
+        filesize = f.get("filesize") or f.get("filesize_approx")
+        vbr = f.get("vbr", 0)
+        
+        # 调试信息：记录每个格式的详细信息
+        logger.info(f"格式 {format_id}: resolution={resolution}, ext={ext}, acodec={acodec}, vbr={vbr}, filesize={filesize}, width={f.get('width')}, height={f.get('height')}, format_note={f.get('format_note')}")
+
+        # 先判断格式是否会被采用，不会显示的格式无需估算文件大小
+        is_audio_only = not audio_format and ext in ("m4a", "mp3") and "audio only" in f.get("format", "")
+        is_video = not is_audio_only and resolution != "未知" and f.get("vcodec", "none") != "none"
+        if not (is_audio_only or is_video):
+            logger.info(f"跳过格式 {format_id}: resolution={resolution}, vbr={vbr}, vcodec={f.get('vcodec', 'none')}")
+            continue
+
+        # 计算文件大小
+        if not filesize:
+            duration = info.get("duration", 0)
+            abr = f.get("abr", 0)
+            total_br = (abr or 0) + (vbr or 0)
+            if duration and total_br:
+                filesize = (total_br * duration * 1000) / 8
+
+        # 查找最佳音频格式
+        if is_audio_only:
+            audio_format = format_id
+            audio_filesize = filesize if filesize else 0
+            
+        # 收集视频格式 - 每个分辨率只保留最优格式
+        else:
+            # 跳过Premium格式和其他可能不可用的格式
+            format_note = f.get("format_note", "").lower()
+            if "premium" in format_note or "membership" in format_note or "paid" in format_note:
+                logger.info(f"跳过Premium格式 {format_id}: {format_note}")
+                continue
+            
+            # 为每个分辨率只保留最优格式（按文件大小排序）
+            if resolution not in video_formats or filesize > video_formats[resolution].get("filesize", 0):
+                video_formats[resolution] = {
+                    "format_id": format_id,
+                    "ext": ext,
+                    "filesize": filesize if filesize else 0,
+                    "vcodec": f.get("vcodec", "none"),
+                    "sort_key": resolution_sort_key(resolution)
+                }
+                logger.info(f"更新最优视频格式: {resolution} -> {format_id} (大小: {filesize})")
+
+    selection["audio_format"] = audio_format
+    selection["audio_filesize"] = audio_filesize
+    return selection
@@ -631,7 +631,12 @@ class LogViewer(QDialog):
     
     def _on_content_loaded(self, content: str) -> None:
         """日志内容加载完成"""
-        self.log_text.setText(content)
+        # 整块写入纯文本并暂停重绘，只做一次排版，避免 setText 的富文本检测和逐段重绘
+        self.log_text.setUpdatesEnabled(False)
+        try:
+            self.log_text.setPlainText(content)
+        finally:
+            self.log_text.setUpdatesEnabled(True)
         self._scroll_to_bottom()
         self._update_stats()
         self.progress_bar.setVisible(False)
@@ -18,6 +18,7 @@
 import re
 import hashlib
 import urllib.parse
+from collections import OrderedDict
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from urllib.parse import urlparse, parse_qs
@@ -47,7 +48,7 @@ class MagnetManager:
     
     def __init__(self):
         """初始化磁力链接管理器"""
-        self.magnet_cache: Dict[str, MagnetInfo] = {}
+        self.magnet_cache: "OrderedDict[str, MagnetInfo]" = OrderedDict()
         self.max_cache_size = 100
         
     def is_magnet_link(self, url: str) -> bool:
@@ -189,15 +190,13 @@ class MagnetManager:
             magnet_info: 磁力链接信息
         """
         try:
-            # 检查缓存大小
-            if len(self.magnet_cache) >= self.max_cache_size:
-                # 移除最旧的缓存项
-                oldest_key = next(iter(self.magnet_cache))
-                del self.magnet_cache[oldest_key]
-            
             # 添加新缓存项
             self.magnet_cache[magnet_info.info_hash] = magnet_info
             
+            # 超出缓存大小时移除最旧的缓存项
+            if len(self.magnet_cache) > self.max_cache_size:
+                self.magnet_cache.popitem(last=False)
+            
         except Exception as e:
             logger.error(f"缓存磁力链接信息失败: {e}")
     
@@ -13,11 +13,24 @@
 
 import os
 import re
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from dataclasses import dataclass
 import yt_dlp
 from PyQt5.QtCore import QThread, pyqtSignal
 
+# 预编译的字幕序号行正则（SRT 每个字幕块开头的纯数字行）
+_SRT_INDEX_RE = re.compile(r'^\d+$')
+
+
+def _iter_joined(parts: Iterable[str], sep: str = '\n') -> Iterator[str]:
+    """逐段产出与 sep.join(parts) 相同的内容，供 writelines 直接写入而不拼出完整字符串"""
+    first = True
+    for part in parts:
+        if not first:
+            yield sep
+        first = False
+        yield part
+
 
 @dataclass
 class SubtitleInfo:
@@ -260,13 +273,13 @@ class SubtitleManager:
     def convert_subtitle_format(self, input_path: str, output_format: str) -> Optional[str]:
         """转换字幕格式"""
         try:
-            if not os.path.exists(input_path):
+            # 直接打开文件，文件不存在时由异常处理，省去一次额外的 stat
+            try:
+                with open(input_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+            except FileNotFoundError:
                 return None
             
-            # 读取原字幕文件
-            with open(input_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
             # 根据输入格式解析内容
             if input_path.endswith('.vtt'):
                 parsed_content = self._parse_vtt(content)
@@ -275,18 +288,18 @@ class SubtitleManager:
             else:
                 return None
             
-            # 转换为目标格式
+            # 转换为目标格式（按行生成）
             if output_format == 'srt':
-                converted_content = self._convert_to_srt(parsed_content)
+                converted_lines = self._iter_srt_lines(parsed_content)
             elif output_format == 'vtt':
-                converted_content = self._convert_to_vtt(parsed_content)
+                converted_lines = self._iter_vtt_lines(parsed_content)
             else:
                 return None
             
-            # 保存转换后的文件
+            # 保存转换后的文件，逐段写入，不再拼接整份字幕内容
             output_path = input_path.rsplit('.', 1)[0] + f'.{output_format}'
             with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(converted_content)
+                f.writelines(_iter_joined(converted_lines))
             
             return output_path
             
@@ -407,51 +420,45 @@ class SubtitleManager:
         
         return f"{hours:02d}:{minutes:02d}:{seconds:02d},{ms:03d}"
     
-    def _convert_to_srt(self, subtitles: List[Dict]) -> str:
-        """转换为SRT格式"""
-        srt_content = []
-        
+    def _iter_srt_lines(self, subtitles: List[Dict]) -> Iterator[str]:
+        """逐行生成SRT格式内容"""
         for i, subtitle in enumerate(subtitles, 1):
-            srt_content.append(str(i))
-            srt_content.append(f"{self._format_srt_time(subtitle['start_time'])} --> {self._format_srt_time(subtitle['end_time'])}")
-            srt_content.append(subtitle['text'])
-            srt_content.append('')
-        
-        return '\n'.join(srt_content)
+            yield str(i)
+            yield f"{self._format_srt_time(subtitle['start_time'])} --> {self._format_srt_time(subtitle['end_time'])}"
+            yield subtitle['text']
+            yield ''
     
-    def _convert_to_vtt(self, subtitles: List[Dict]) -> str:
-        """转换为VTT格式"""
-        vtt_content = ['WEBVTT', '']
-        
+    def _iter_vtt_lines(self, subtitles: List[Dict]) -> Iterator[str]:
+        """逐行生成VTT格式内容"""
+        yield 'WEBVTT'
+        yield ''
         for subtitle in subtitles:
-            vtt_content.append(f"{self._format_vtt_time(subtitle['start_time'])} --> {self._format_vtt_time(subtitle['end_time'])}")
-            vtt_content.append(subtitle['text'])
-            vtt_content.append('')
-        
-        return '\n'.join(vtt_content)
+            yield f"{self._format_vtt_time(subtitle['start_time'])} --> {self._format_vtt_time(subtitle['end_time'])}"
+            yield subtitle['text']
+            yield ''
     
     def preview_subtitle(self, subtitle_path: str, max_lines: int = 10) -> str:
         """预览字幕内容"""
         try:
-            if not os.path.exists(subtitle_path):
+            # 逐行读取字幕文本（跳过时间戳和序号），只保留预览所需的行，其余只计数
+            # 直接打开文件，文件不存在时由异常处理，省去一次额外的 stat
+            preview_lines = []
+            text_line_count = 0
+            try:
+                with open(subtitle_path, 'r', encoding='utf-8', buffering=1 << 20) as f:
+                    for line in f:
+                        line = line.strip()
+                        if line and not _SRT_INDEX_RE.match(line) and '-->' not in line and not line.startswith('WEBVTT'):
+                            text_line_count += 1
+                            if len(preview_lines) < max_lines:
+                                preview_lines.append(line)
+            except FileNotFoundError:
                 return "字幕文件不存在"
-            
-            with open(subtitle_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            
-            # 提取字幕文本（跳过时间戳和序号）
-            text_lines = []
-            for line in lines:
-                line = line.strip()
-                if line and not re.match(r'^\d+$', line) and '-->' not in line and not line.startswith('WEBVTT'):
-                    text_lines.append(line)
-            
-            # 限制预览行数
-            preview_lines = text_lines[:max_lines]
+
             preview_text = '\n'.join(preview_lines)
-            
-            if len(text_lines) > max_lines:
-                preview_text += f'\n... (共{len(text_lines)}行)'
+
+            if text_line_count > max_lines:
+                preview_text += f'\n... (共{text_line_count}行)'
             
             return preview_text
             
@@ -58,16 +58,30 @@ class VideoDownloader(QMainWindow, VideoDownloaderMethods):
         # 基础配置
         self.save_path: str = os.getcwd()                    # 文件保存路径
         self.parse_cache: OrderedDict = OrderedDict()        # 解析结果缓存
+        self._parsed_in_batch: set = set()                   # 本轮解析已处理的视频URL
+        self._pending_names: set = set()                     # 本轮解析已分配的文件名
+        self._res_groups: Dict[str, QTreeWidgetItem] = {}   # 分辨率名称 -> 分组节点
+        self._checked_children: Dict[int, set] = {}          # 分组节点id -> 已勾选的子项集合
         self.formats: List[Dict] = []                        # 可用格式列表
-        self.download_progress: Dict[str, Tuple[float, str]] = {}  # 下载进度信息
+        self.download_progress: Dict[str, List] = {}         # 下载进度信息：文件名 -> [百分比, 速度]
+        self._worker_progress_keys: Dict[DownloadWorker, set] = {}  # 下载线程 -> 其产生的进度项文件名，结束时一并移除
+        self._progress_sum: float = 0.0                      # download_progress 中进度百分比之和
+        self._title_permille: int = -1                       # 窗口标题当前显示的进度（千分比），-1 表示未显示进度
         self.is_downloading: bool = False                    # 下载状态标志
         
         # 工作线程管理
-        self.download_workers: List[DownloadWorker] = []     # 下载工作线程列表
+        self.download_workers: set = set()                   # 运行中的下载工作线程
+        self._download_worker_pool: List[DownloadWorker] = []  # 已结束、可复用的下载线程对象
+        self._postprocessing_workers: set = set()            # 已结束网络下载、正在后处理的线程
         self.parse_workers: List[ParseWorker] = []           # 解析工作线程列表
+        self._pending_parse_urls: deque = deque()            # 等待解析的URL队列
+        self._active_parse_count: int = 0                    # 运行中的解析线程数量
 
         self.netease_music_workers: List = []                # 网易云音乐解析工作线程列表
+        # 下载队列：只在界面线程中读写（工作线程的完成/错误信号均以排队连接投递到界面线程的槽），
+        # 因此直接使用 deque 的 append/popleft，无需加锁
         self.download_queue: deque = deque()                 # 下载队列
+        self._download_ratelimit: Optional[int] = None       # 本批下载的限速（字节/秒），开始下载时读取一次
         
         # 状态计数
         self.active_downloads: int = 0                       # 活动下载数量
@@ -77,6 +91,7 @@ class VideoDownloader(QMainWindow, VideoDownloaderMethods):
         
         # 外部依赖
         self.ffmpeg_path: Optional[str] = None  # FFmpeg路径，稍后初始化
+        self._ffmpeg_checked_key: Optional[Tuple[Optional[str], str]] = None  # 上次通过 FFmpeg 检查时的 (FFmpeg路径, 保存路径)
         self.settings = QSettings("MyCompany", "VideoDownloader")  # 设置管理器
         
         # 系统托盘相关
@@ -913,10 +928,17 @@ class VideoDownloader(QMainWindow, VideoDownloaderMethods):
         # ==================== 定时器设置 ====================
         
         # 创建定时器用于更新下载进度
+        # 定时器只在下载期间运行：由 download_selected 启动，下载结束后在 update_download_progress 中停止
         self.timer = QTimer(self)
+        self.timer.setInterval(500)  # 每500毫秒更新一次
         self.timer.timeout.connect(self.update_download_progress)
-        # 确保定时器在主线程中运行
-        self.timer.start(500)  # 每500毫秒更新一次
+        
+        # 状态栏滚动信息合并刷新：工作线程的日志可能每秒数十条，最多每100毫秒刷新一次标签
+        self._pending_scroll_text: Optional[str] = None
+        self._scroll_timer = QTimer(self)
+        self._scroll_timer.setSingleShot(True)
+        self._scroll_timer.setInterval(100)
+        self._scroll_timer.timeout.connect(self._flush_scroll_status)
 
     def update_status_bar(self, main_status: str, progress_info: str = "", file_info: str = "") -> None:
         """
@@ -939,7 +961,8 @@ class VideoDownloader(QMainWindow, VideoDownloaderMethods):
         # 合并状态信息
         combined_status = " | ".join(status_parts) if status_parts else "就绪"
         
-        # 更新状态栏显示
+        # 更新状态栏显示，丢弃尚未刷新的滚动信息，避免其随后覆盖本次状态
+        self._pending_scroll_text = None
         self.current_status = combined_status
         self.status_scroll_label.setText(combined_status)
 
@@ -966,6 +989,22 @@ class VideoDownloader(QMainWindow, VideoDownloaderMethods):
                 return
             
             # 不过滤任何消息，显示所有后台信息
+            # 只记录最新一条，由定时器合并刷新到标签
+            self._pending_scroll_text = status_text
+            if not self._scroll_timer.isActive():
+                self._scroll_timer.start()
+                
+        except Exception as e:
+            # 记录错误但不影响程序运行
+            print(f"状态栏更新失败: {e}")
+    
+    def _flush_scroll_status(self) -> None:
+        """将最新一条滚动状态写入状态栏标签"""
+        status_text = self._pending_scroll_text
+        if status_text is None:
+            return
+        self._pending_scroll_text = None
+        try:
             # 添加时间戳
             from datetime import datetime
             timestamp = datetime.now().strftime("%H:%M:%S")
@@ -1267,14 +1306,14 @@ class VideoDownloader(QMainWindow, VideoDownloaderMethods):
                 self.parse_workers.remove(worker)
             
             # 清理下载工作线程
-            for worker in self.download_workers[:]:
+            for worker in list(self.download_workers):
                 if worker and worker.isRunning():
                     worker.cancel()
                     worker.wait(3000)
                     if worker.isRunning():
                         worker.terminate()
                         worker.wait(1000)
-                self.download_workers.remove(worker)
+                self.download_workers.discard(worker)
             
             # 清理网易云音乐工作线程
             for worker in self.netease_music_workers[:]:
@@ -1287,7 +1326,7 @@ class VideoDownloader(QMainWindow, VideoDownloaderMethods):
             # 清空缓存和队列
             self.parse_cache.clear()
             self.formats.clear()
-            self.download_progress.clear()
+            self._clear_progress()
             self.download_queue.clear()
             
             logger.info("所有工作线程已清理完成")
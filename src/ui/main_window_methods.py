@@ -14,6 +14,7 @@
 作者: 椰果IDM开发团队
 版本: 1.0.0"""
 
+import copy
 import os
 import re
 import time
@@ -22,15 +23,18 @@ import gc
 import psutil
 import shutil
 from typing import Dict, List, Optional, Tuple, Any
-from collections import OrderedDict
+from collections import OrderedDict, deque
+from functools import partial
+from types import MappingProxyType
 
 from PyQt5.QtWidgets import (
     QMessageBox, QFileDialog, QTreeWidgetItem, QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QMenu, QApplication
 )
-from PyQt5.QtCore import Qt, QUrl, QPoint, QTimer
+from PyQt5.QtCore import Qt, QUrl, QPoint, QTimer, QThread
 from PyQt5.QtGui import QCloseEvent, QDesktopServices, QPixmap
 
 from ..core.config import Config
+from ..core.format_selector import get_resolution, standardize_resolution, select_entry_formats, resolution_sort_key
 from ..core.magnet_manager import magnet_manager
 from ..core.ed2k_manager import ed2k_manager
 from ..core.queue_manager import queue_manager, DownloadStatus
@@ -51,127 +55,152 @@ from ..workers.magnet_download_worker import MagnetDownloadWorker
 from ..workers.ed2k_download_worker import ED2KDownloadWorker
 
 
+# 预编译的正则表达式，用于去除文件名末尾的数字后缀
+_NUM_SUFFIX_RE = re.compile(r"_\d+$")
 
-def is_standard_resolution(resolution: str) -> bool:
-    """
-    判断是否为标准分辨率
+# 视频下载的固定 yt-dlp 选项模板（只读），每次下载深复制后再填入路径、格式等动态选项，
+# 嵌套的请求头和后处理器列表也随之复制，某个下载修改它们不会影响之后的任务
+_DOWNLOAD_YDL_OPTS_BASE = MappingProxyType({
+    "quiet": False,
+    "verbose": True,  # 启用详细日志以诊断FFmpeg问题
     
-    Args:
-        resolution: 分辨率字符串，如 "1920x1080", "1280x720" 等
-        
-    Returns:
-        bool: 是否为标准分辨率
-    """
-    # 标准分辨率列表 - 扩展支持更多常见分辨率
-    standard_resolutions = {
-        # 4K
-        "3840x2160", "4096x2160",
-        # 2K
-        "2560x1440", "2048x1080",
-        # 1080P
-        "1920x1080", "1920x1088", "1440x1080",  # 添加1440x1080（4:3比例1080P）
-        # 720P
-        "1280x720", "1280x736", "960x720",  # 添加960x720（4:3比例720P）
-        # 480P - 添加更多变体
-        "854x480", "848x480", "832x480", "852x480", "850x480", "856x480", "858x480", "860x480", "862x480", "864x480", "866x480", "868x480", "870x480", "872x480", "874x480", "876x480", "878x480", "880x480",
-        # 360P
-        "640x360", "640x368", "640x480",  # 添加640x480（4:3比例480P）
-        # 240P
-        "426x240", "424x240", "480x360",  # 添加480x360（4:3比例360P）
-        # 144P
-        "256x144", "256x160"
-    }
+    # 下载恢复和断点续传
+    "continuedl": True,  # 启用断点续传
+    "noprogress": False,  # 显示进度
     
-    # 清理分辨率字符串，移除空格和特殊字符
-    clean_resolution = resolution.strip().lower()
+    # 错误处理
+    "ignoreerrors": False,  # 不忽略错误，确保错误被正确处理
+    "no_warnings": False,  # 显示警告信息
     
-    # 检查是否在标准分辨率列表中
-    if clean_resolution in standard_resolutions:
-        return True
+    # 网络配置
+    "prefer_insecure": True,  # 优先使用不安全的连接
+    "no_check_certificate": True,  # 不检查证书
     
-    # 检查是否为音频格式（没有分辨率）
-    if clean_resolution in ["audio only", "audio_only", "audio"]:
-        return True
+    # 请求头配置
+    "headers": {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.5",
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+    },
     
-    # 检查是否为标准P格式（如1080p, 720p等）
-    if re.match(r"^\d+p$", clean_resolution):
-        p_value = int(clean_resolution[:-1])
-        if p_value in [144, 240, 360, 480, 720, 1080, 1440, 2160]:
-            return True
+    # 确保FFmpeg进行音视频合并
+    # yt-dlp 先把音视频分别写入临时文件，再以文件路径调用 FFmpeg 做流复制合并（-c copy），
+    # 合并过程不经过管道，因此无需调整管道缓冲区；也不加 +faststart，它会额外重写一遍整个文件
+    "merge_output_format": "mp4",
+    "prefer_ffmpeg": True,
     
-    # 检查是否为接近标准分辨率的格式（允许±1像素的误差）
-    if "x" in clean_resolution:
-        try:
-            width, height = clean_resolution.split("x")
-            width, height = int(width), int(height)
-            
-            # 检查是否接近标准分辨率
-            for std_res in standard_resolutions:
-                if "x" in std_res:
-                    std_width, std_height = std_res.split("x")
-                    std_width, std_height = int(std_width), int(std_height)
-                    
-                    # 允许±4像素的误差，以包含更多变体
-                    if abs(width - std_width) <= 4 and abs(height - std_height) <= 4:
-                        return True
-        except (ValueError, IndexError):
-            pass
+    # 添加后处理器配置，确保音视频正确合并
+    "postprocessors": [{
+        'key': 'FFmpegVideoConvertor',
+        'preferedformat': 'mp4',
+    }],
     
-    return False
-
-
-def filter_formats(formats: List[Dict], strict_filter: bool = False) -> List[Dict]:
-    """
-    过滤格式列表，只保留标准分辨率的格式
+    # 文件覆盖配置，避免同名文件导致下载失败
+    "overwrites": True,
     
-    Args:
-        formats: 原始格式列表
-        strict_filter: 是否使用严格过滤模式，False时保留更多格式
-        
-    Returns:
-        List[Dict]: 过滤后的格式列表
-    """
-    filtered_formats = []
+    # 优化下载配置 - 适度并发，提高稳定性
+    "concurrent_fragment_downloads": 8,  # 减少并发，提高稳定性
+    "concurrent_fragments": 8,
+    "http_chunk_size": 8388608,  # 8MB块大小，平衡速度和稳定性
+    "buffersize": 32768,  # 32KB缓冲区
     
-    for format_info in formats:
-        # 获取分辨率信息
-        resolution = format_info.get("resolution", "")
-        format_note = format_info.get("format_note", "")
-        width = format_info.get("width")
-        height = format_info.get("height")
-        
-        # 构建完整的分辨率字符串
-        resolution_str = resolution
-        if not resolution_str and width and height:
-            resolution_str = f"{width}x{height}"
-        elif not resolution_str and format_note:
-            resolution_str = format_note
-        
-        # 检查是否为音频格式
-        acodec = format_info.get("acodec", "none")
-        vcodec = format_info.get("vcodec", "none")
-        if acodec != "none" and vcodec == "none":
-            # 音频格式，保留
-            filtered_formats.append(format_info)
-            continue
-        
-        # 检查是否为视频格式
-        if vcodec == "none":
-            # 跳过纯音频格式（非视频）
-            continue
-        
-        # 如果不使用严格过滤，保留所有视频格式
-        if not strict_filter:
-            filtered_formats.append(format_info)
-            continue
-        
-        # 严格过滤模式：只保留标准分辨率的格式
-        if is_standard_resolution(resolution_str):
-            filtered_formats.append(format_info)
-        else:
-            logger.info(f"过滤掉非标准分辨率: {resolution_str} (原始: {resolution}, 说明: {format_note}, 宽高: {width}x{height})")
+    # 网络优化 - 适度超时，提高成功率
+    "socket_timeout": 90,  # 适度超时时间
+    "retries": 8,  # 适度重试次数
+    "fragment_retries": 5,
+    "extractor_retries": 3,
+})
+
+# 网易云音乐下载的固定 yt-dlp 选项模板（只读），针对其反爬虫机制增强了重试和请求头
+_NETEASE_YDL_OPTS_BASE = MappingProxyType({
+    "quiet": False,
+    
+    # 增强下载稳定性配置
+    "retries": 15,
+    "fragment_retries": 15,
+    "extractor_retries": 10,
+    "socket_timeout": 120,
+    "http_chunk_size": 10485760,
+    "buffersize": 8192,
+    
+    # 下载恢复和断点续传
+    "continuedl": True,
+    "noprogress": False,
+    
+    # 错误处理
+    "ignoreerrors": False,
+    "no_warnings": False,
+    
+    # 网络配置
+    "prefer_insecure": True,
+    "no_check_certificate": True,
+    "nocheckcertificate": True,
     
-    return filtered_formats
+    # 允许FFmpeg进行音视频合并
+    "merge_output_format": "mp4",  # 指定合并格式为mp4
+    
+    # 地理绕过
+    "geo_bypass": True,
+    "geo_bypass_country": "CN",
+    
+    # 请求头配置 - 模拟真实浏览器
+    "headers": {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+        "Accept-Encoding": "gzip, deflate, br",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+        "Sec-Fetch-Dest": "document",
+        "Sec-Fetch-Mode": "navigate",
+        "Sec-Fetch-Site": "none",
+        "Sec-Fetch-User": "?1",
+        "Cache-Control": "max-age=0",
+        "Referer": "https://music.163.com/",
+        "Origin": "https://music.163.com",
+        "DNT": "1",
+    },
+    
+    # 额外的HTTP头部
+    "http_headers": {
+        "Referer": "https://music.163.com/",
+        "Origin": "https://music.163.com",
+        "X-Requested-With": "XMLHttpRequest",
+    },
+    
+    # 下载策略
+    "concurrent_fragment_downloads": 5,
+    "max_sleep_interval": 5,
+    "sleep_interval": 1,
+    
+    # 格式选择策略
+    "format": "best[ext=mp3]/best",
+    "format_sort": ["ext:mp3:m4a", "quality", "filesize"],
+    
+    # 重试策略
+    "retry_sleep": "exponential",
+    "max_retries": 15,
+})
+
+# 下载中窗口标题的固定前缀，只需拼接进度百分比
+_DOWNLOADING_TITLE_PREFIX = f"椰果IDM-v{Config.APP_VERSION} - 下载中 ("
+
+# 非 yt-dlp 视频下载的格式类型 -> 对应的启动方法名
+_SPECIAL_DOWNLOAD_STARTERS = MappingProxyType({
+    "magnet": "_start_magnet_download",
+    "ed2k": "_start_ed2k_download",
+    "netease_music": "_start_netease_music_download",
+})
+
+# 按清晰度从高到低匹配的格式表达式，确保包含音频
+_HEIGHT_FORMAT_SPECS = (
+    (1080, "best[height>=1080]+bestaudio/best"),
+    (720, "best[height>=720]+bestaudio/best"),
+    (480, "best[height>=480]+bestaudio/best"),
+    (360, "best[height>=360]+bestaudio/best"),
+)
 
 
 class VideoDownloaderMethods:
@@ -193,6 +222,17 @@ class VideoDownloaderMethods:
         self.ffmpeg_path = None
         self._init_ffmpeg_path()
     
+    @property
+    def save_path(self) -> str:
+        """文件保存路径"""
+        return self._save_path
+
+    @save_path.setter
+    def save_path(self, path: str) -> None:
+        # 同时预先计算带分隔符的路径前缀，拼接文件路径时直接字符串相加，无需每次 os.path.join
+        self._save_path = path
+        self._save_prefix = path.rstrip(os.sep + (os.altsep or "")) + os.sep
+
     def load_settings(self) -> None:
         """加载保存的设置"""
         self.save_path = self.settings.value("save_path", os.getcwd())
@@ -205,6 +245,7 @@ class VideoDownloaderMethods:
         folder = QFileDialog.getExistingDirectory(self, "选择保存路径", self.save_path)
         if folder:
             self.save_path = folder
+            self._pending_names.clear()
             # 如果 path_label 已存在，则更新其文本
             if hasattr(self, 'path_label'):
                 self.path_label.setText(f"保存路径: {self.save_path}")
@@ -233,7 +274,7 @@ class VideoDownloaderMethods:
             pass
         
         # 检查是否为标准HTTP/HTTPS链接
-        return bool(re.match(r"^https?://.*", url))
+        return url.startswith(("http://", "https://"))
 
     def toggle_checkbox(self, item: QTreeWidgetItem, column: int) -> None:
         """双击切换复选框状态"""
@@ -262,6 +303,8 @@ class VideoDownloaderMethods:
                     root_item.setCheckState(0, Qt.Checked)
         finally:
             self.format_tree.blockSignals(False)
+        # 批量修改后勾选集合失效，下次单项变化时按需重建
+        self._checked_children.clear()
         self.update_selection_count()
         self.update_smart_select_button_text()
 
@@ -284,6 +327,8 @@ class VideoDownloaderMethods:
                     root_item.setCheckState(0, Qt.Unchecked)
         finally:
             self.format_tree.blockSignals(False)
+        # 批量修改后勾选集合失效，下次单项变化时按需重建
+        self._checked_children.clear()
         self.update_selection_count()
         self.update_smart_select_button_text()
 
@@ -311,6 +356,8 @@ class VideoDownloaderMethods:
                     root_item.setCheckState(0, new_state)
         finally:
             self.format_tree.blockSignals(False)
+        # 批量修改后勾选集合失效，下次单项变化时按需重建
+        self._checked_children.clear()
         self.update_selection_count()
         self.update_smart_select_button_text()
 
@@ -436,6 +483,8 @@ class VideoDownloaderMethods:
         """处理网易云音乐链接解析"""
         # 清空之前的结果
         self.format_tree.clear()
+        self._res_groups.clear()
+        self._checked_children.clear()
         self.formats = []
         self.smart_download_button.setEnabled(False)
         self.smart_select_button.setEnabled(False)
@@ -725,10 +774,13 @@ class VideoDownloaderMethods:
     
     def _parse_video_urls(self, urls: List[str]) -> None:
         """解析视频URL列表"""
-        # 清空之前的结果
+        # 清空之前的结果（解析缓存跨批次保留，用于跳过重复解析）
         self.format_tree.clear()
+        self._res_groups.clear()
+        self._checked_children.clear()
         self.formats = []
-        self.parse_cache.clear()  # 清空解析缓存
+        self._parsed_in_batch.clear()
+        self._pending_names.clear()
         self.smart_download_button.setEnabled(False)
         
         # 禁用选择按钮
@@ -747,11 +799,29 @@ class VideoDownloaderMethods:
         self.cancel_parse_button.setEnabled(True)
         
         self.parse_workers = []
-        self.total_urls = len(urls)
+        self._pending_parse_urls.clear()
+        self._active_parse_count = 0
+        self.total_urls = len(urls)  # 缓存命中的URL同样计入解析进度
         self.parsed_count = 0
         self.is_parsing = True  # 添加解析状态标志
         
-        for url in urls:
+        # 已缓存的URL直接复用解析结果，只为未命中的URL启动工作线程
+        cached = [url for url in urls if url in self.parse_cache]
+        to_fetch = [url for url in urls if url not in self.parse_cache]
+        for url in cached:
+            info = self.get_cached(url)
+            logger.info(f"命中解析缓存，跳过重新解析: {url}")
+            QTimer.singleShot(0, lambda info=info, url=url: self._finish_cached_parse(info, url))
+        
+        # 未命中的URL进入队列，按并发上限启动解析线程
+        self._pending_parse_urls.extend(to_fetch)
+        self._start_pending_parses()
+
+    def _start_pending_parses(self) -> None:
+        """从等待队列中启动解析线程，直到达到并发上限"""
+        max_parses = Config.MAX_CONCURRENT_PARSES
+        while self._pending_parse_urls and self._active_parse_count < max_parses:
+            url = self._pending_parse_urls.popleft()
             worker = ParseWorker(url)
             worker.status_signal.connect(self.update_scroll_status)  # 连接状态信号
             worker.log_signal.connect(self.update_scroll_status)  # 连接日志信号到状态栏
@@ -759,14 +829,33 @@ class VideoDownloaderMethods:
             worker.video_parsed_signal.connect(self.on_video_parsed)  # 连接视频解析信号
             worker.finished.connect(self.on_parse_completed)  # 连接完成信号
             worker.error.connect(self.on_parse_error)
+            # 工作线程结束后释放并发名额、释放线程对象并启动下一个
+            worker.finished.connect(lambda _info, w=worker: self._on_parse_worker_done(w))
+            worker.error.connect(lambda _error, w=worker: self._on_parse_worker_done(w))
             
-            # 立即启动工作线程，避免延迟导致的UI阻塞感
             worker.start()
             self.parse_workers.append(worker)
-            
-            # 短暂延迟，避免同时启动过多线程
-            import time
-            time.sleep(0.05)  # 50毫秒延迟
+            self._active_parse_count += 1
+
+    def _on_parse_worker_done(self, worker: ParseWorker) -> None:
+        """解析线程结束，释放并发名额并及时丢弃线程引用，parse_workers 只保留运行中的线程"""
+        with self._parse_lock:
+            if self._active_parse_count > 0:
+                self._active_parse_count -= 1
+            if worker in self.parse_workers:
+                self.parse_workers.remove(worker)
+        # 信号在 run 返回前发出，等待线程真正退出后再交给 Qt 释放
+        worker.wait()
+        worker.deleteLater()
+        if self.is_parsing:
+            self._start_pending_parses()
+
+    def _finish_cached_parse(self, info: Dict, url: str) -> None:
+        """使用缓存的解析结果完成单个URL的解析"""
+        if not self.is_parsing:
+            return
+        self.on_video_parsed(info, url)
+        self.on_parse_completed(info)
 
     def on_parse_progress(self, current_progress: int, total_count: int) -> None:
         """处理解析进度更新"""
@@ -787,15 +876,13 @@ class VideoDownloaderMethods:
             video_id = info.get("id", "")
             webpage_url = info.get("webpage_url", url)
             
-            # 检查是否已经缓存过这个视频
-            if webpage_url in self.parse_cache:
+            # 检查本轮解析是否已经处理过这个视频
+            if webpage_url in self._parsed_in_batch:
                 logger.info(f"视频已存在，跳过重复处理: {video_id}")
                 return
             
-            with self._cache_lock:
-                self.parse_cache[webpage_url] = info
-                if len(self.parse_cache) > Config.CACHE_LIMIT:
-                    self.parse_cache.popitem()
+            self._parsed_in_batch.add(webpage_url)
+            self._cache_parse_result(webpage_url, info)
 
             # 立即处理并显示当前视频的解析结果
             self.on_parse_finished(info)
@@ -809,14 +896,16 @@ class VideoDownloaderMethods:
     def on_parse_completed(self, info: Dict) -> None:
         """处理解析完成"""
         try:
-            self.parsed_count += 1
+            with self._parse_lock:
+                self.parsed_count += 1
+                all_parsed = self.parsed_count == self.total_urls
             
             # 实时更新状态栏显示解析进度
             progress_text = f"解析进度: {self.parsed_count}/{self.total_urls}"
             self.update_status_bar(progress_text, "", "")
             
             # 如果所有视频都解析完成，执行最终处理
-            if self.parsed_count == self.total_urls and all(not w.isRunning() for w in self.parse_workers) and all(not w.isRunning() for w in self.netease_music_workers):
+            if all_parsed and all(not w.isRunning() for w in self.netease_music_workers):
                 try:
                     self.finalize_parse()
                 except Exception as e:
@@ -840,28 +929,28 @@ class VideoDownloaderMethods:
             video_id = info.get("id", "")
             webpage_url = info.get("webpage_url", url)
             
-            # 检查是否已经缓存过这个视频
-            if webpage_url in self.parse_cache:
+            # 检查本轮解析是否已经处理过这个视频
+            if webpage_url in self._parsed_in_batch:
                 logger.info(f"视频已存在，跳过重复处理: {video_id}")
                 self.parsed_count += 1
                 return
             
-            with self._cache_lock:
-                self.parse_cache[webpage_url] = info
-                if len(self.parse_cache) > Config.CACHE_LIMIT:
-                    self.parse_cache.popitem()
+            self._parsed_in_batch.add(webpage_url)
+            self._cache_parse_result(webpage_url, info)
 
             # 立即处理并显示当前视频的解析结果
             self.on_parse_finished(info)
 
-            self.parsed_count += 1
+            with self._parse_lock:
+                self.parsed_count += 1
+                all_parsed = self.parsed_count == self.total_urls
             
             # 实时更新状态栏显示解析进度
             progress_text = f"解析进度: {self.parsed_count}/{self.total_urls}"
             self.update_status_bar(progress_text, "", "")
             
             # 如果所有视频都解析完成，执行最终处理
-            if self.parsed_count == self.total_urls and all(not w.isRunning() for w in self.parse_workers) and all(not w.isRunning() for w in self.netease_music_workers):
+            if all_parsed and all(not w.isRunning() for w in self.netease_music_workers):
                 try:
                     self.finalize_parse()
                 except Exception as e:
@@ -874,6 +963,22 @@ class VideoDownloaderMethods:
             self.update_status_bar(f"解析失败: {str(e)}", "", "")
             self.reset_parse_state()
 
+    def get_cached(self, url: str) -> Optional[Dict]:
+        """获取缓存的解析结果，命中时将其标记为最近使用"""
+        with self._cache_lock:
+            info = self.parse_cache.get(url)
+            if info is not None:
+                self.parse_cache.move_to_end(url)
+            return info
+
+    def _cache_parse_result(self, url: str, info: Dict) -> None:
+        """写入解析缓存，超出上限时淘汰最久未使用的条目"""
+        with self._cache_lock:
+            self.parse_cache[url] = info
+            self.parse_cache.move_to_end(url)
+            while len(self.parse_cache) > Config.CACHE_LIMIT:
+                self.parse_cache.popitem(last=False)
+
     def finalize_parse(self) -> None:
         """完成解析并更新 UI"""
         if self.formats:
@@ -928,7 +1033,7 @@ class VideoDownloaderMethods:
                     if "🎵" in root_item.text(0):  # 音乐文件在根节点有🎵标识
                         unique_music_names.add(filename)
                     else:
-                        base_filename = re.sub(r"_\d+$", "", filename)
+                        base_filename = _NUM_SUFFIX_RE.sub("", filename)
                         unique_filenames.add(base_filename)
             
             unique_video_count = len(unique_filenames)
@@ -978,85 +1083,21 @@ class VideoDownloaderMethods:
 
 
 
+    def _scan_save_path(self) -> set:
+        """通过一次 os.scandir 读取保存路径下的文件名"""
+        try:
+            with os.scandir(self.save_path) as entries:
+                return {entry.name for entry in entries}
+        except OSError:
+            return set()
+
     def get_resolution(self, f: Dict) -> str:
         """从格式信息中提取分辨率并标准化"""
-        # 首先检查 resolution 字段
-        resolution = f.get("resolution", "")
-        if resolution and resolution != "audio only" and "x" in resolution:
-            return self.standardize_resolution(resolution)
-            
-        # 检查 width 和 height 字段
-        width = f.get("width")
-        height = f.get("height")
-        if width and height:
-            return self.standardize_resolution(f"{width}x{height}")
-        elif height:
-            return f"{height}p"
-            
-        # 检查 format_note 字段
-        format_note = f.get("format_note", "")
-        if format_note and format_note != "unknown":
-            # 尝试从 format_note 中提取分辨率
-            if "x" in format_note:
-                return self.standardize_resolution(format_note)
-            elif format_note.isdigit():
-                return f"{format_note}p"
-                
-        # 检查 format 字段
-        format_str = f.get("format", "")
-        if "x" in format_str:
-            match = re.search(r"(\d+)x(\d+)", format_str)
-            if match:
-                return self.standardize_resolution(f"{match.group(1)}x{match.group(2)}")
-                
-        # 检查是否为音频格式
-        if f.get("acodec", "none") != "none" and f.get("vcodec", "none") == "none":
-            return "audio only"
-            
-        # 如果都找不到，返回未知
-        return "未知"
+        return get_resolution(f)
 
     def standardize_resolution(self, resolution: str) -> str:
         """标准化分辨率到主流分辨率"""
-        if not resolution or "x" not in resolution:
-            return resolution
-            
-        try:
-            width, height = resolution.split("x")
-            width, height = int(width), int(height)
-            
-            # 1080P 变体 → 1920x1080 或 1440x1080
-            if abs(height - 1080) <= 4:
-                if abs(width - 1920) <= 4:
-                    return "1920x1080"
-                elif abs(width - 1440) <= 4:
-                    return "1440x1080"
-            # 720P 变体 → 1280x720 或 960x720
-            elif abs(height - 720) <= 4:
-                if abs(width - 1280) <= 4:
-                    return "1280x720"
-                elif abs(width - 960) <= 4:
-                    return "960x720"
-            # 480P 变体 → 852x480 或 640x480
-            elif abs(height - 480) <= 4:
-                if abs(width - 852) <= 4:
-                    return "852x480"
-                elif abs(width - 640) <= 4:
-                    return "640x480"
-            # 360P 变体 → 640x360 或 480x360
-            elif abs(height - 360) <= 4:
-                if abs(width - 640) <= 4:
-                    return "640x360"
-                elif abs(width - 480) <= 4:
-                    return "480x360"
-            # 240P 变体 → 426x240
-            elif abs(height - 240) <= 4:
-                if abs(width - 426) <= 4:
-                    return "426x240"
-            else:
-                return resolution
-        except (ValueError, IndexError):
-            return resolution
+        return standardize_resolution(resolution)
 
     def on_parse_finished(
         self,
@@ -1071,45 +1112,17 @@ class VideoDownloaderMethods:
             logger.info(f"视频已存在，跳过重复添加: {video_title} (ID: {video_id})")
             return
             
-        audio_format = None
-        audio_filesize = 0
-        video_formats: Dict[str, Dict] = {}
-
-        # 处理视频标题格式 - 优化合集视频处理
-        # 检查是否为合集视频的一部分
-        if "p" in video_title.lower() and re.search(r"p\d+", video_title):
-            # 合集视频，提取部分标题
-            match = re.search(r"p\d+\s*(.+?)(?:_\w+)?$", video_title)
-            if match:
-                part_title = match.group(1).strip()
-                formatted_title = part_title
-            else:
-                # 如果无法提取部分标题，使用完整标题
-                formatted_title = video_title
-        else:
-            # 单个视频，使用完整标题
-            formatted_title = video_title
-            if f"_{video_id}" in formatted_title:
-                formatted_title = formatted_title.replace(f"_{video_id}", "")
-        
-        # 确保标题不为空
-        if not formatted_title.strip():
-            formatted_title = f"视频_{video_id}"
-        
-        # 不再添加方括号包装
-        # if not formatted_title.startswith("["):
-        #     formatted_title = f"[{formatted_title}]"
+        # 格式挑选通常已在解析线程中完成；缓存中的旧数据等情况在此补算
+        selection = info.get("_format_selection") or select_entry_formats(info)
+        formatted_title = selection["formatted_title"]
+        filtered_formats = selection["filtered_formats"]
+        audio_format = selection["audio_format"]
+        audio_filesize = selection["audio_filesize"]
+        video_formats = selection["video_formats"]
 
         # 不再创建视频根节点，直接使用分辨率分组
         video_root = None
 
-        formats = info.get("formats", [])
-        logger.info(f"解析条目 '{video_title}'，共有 {len(formats)} 个格式")
-
-        # 过滤格式，保留所有视频格式（非严格过滤）
-        filtered_formats = filter_formats(formats, strict_filter=False)
-        logger.info(f"过滤后剩余 {len(filtered_formats)} 个格式")
-
         # 检查是否为ED2K或磁力链接类型
         link_type = info.get('type', '')
         if link_type in ['ed2k', 'magnet']:
@@ -1146,51 +1159,11 @@ class VideoDownloaderMethods:
 
             return
 
-        # 处理格式信息
-        for f in filtered_formats:
-            format_id = f.get("format_id")
-            resolution = self.get_resolution(f)
-            ext = f.get("ext", "")
-            acodec = f.get("acodec", "none")
-            filesize = f.get("filesize") or f.get("filesize_approx")
-            vbr = f.get("vbr", 0)
-            
-            # 调试信息：记录每个格式的详细信息
-            logger.info(f"格式 {format_id}: resolution={resolution}, ext={ext}, acodec={acodec}, vbr={vbr}, filesize={filesize}, width={f.get('width')}, height={f.get('height')}, format_note={f.get('format_note')}")
-
-            # 计算文件大小
-            if not filesize:
-                duration = info.get("duration", 0)
-                abr = f.get("abr", 0)
-                total_br = (abr or 0) + (vbr or 0)
-                if duration and total_br:
-                    filesize = (total_br * duration * 1000) / 8
-
-            # 查找最佳音频格式
-            if "audio only" in f.get("format", "") and ext in ["m4a", "mp3"] and not audio_format:
-                audio_format = format_id
-                audio_filesize = filesize if filesize else 0
-                
-            # 收集视频格式 - 每个分辨率只保留最优格式
-            elif resolution != "未知" and f.get("vcodec", "none") != "none":
-                # 跳过Premium格式和其他可能不可用的格式
-                format_note = f.get("format_note", "").lower()
-                if "premium" in format_note or "membership" in format_note or "paid" in format_note:
-                    logger.info(f"跳过Premium格式 {format_id}: {format_note}")
-                    continue
-                
-                # 为每个分辨率只保留最优格式（按文件大小排序）
-                if resolution not in video_formats or filesize > video_formats[resolution].get("filesize", 0):
-                    video_formats[resolution] = {
-                        "format_id": format_id,
-                        "ext": ext,
-                        "filesize": filesize if filesize else 0,
-                        "vcodec": f.get("vcodec", "none")
-                    }
-                    logger.info(f"更新最优视频格式: {resolution} -> {format_id} (大小: {filesize})")
-            else:
-                logger.info(f"跳过格式 {format_id}: resolution={resolution}, vbr={vbr}, vcodec={f.get('vcodec', 'none')}")
-
+        # 保存路径下的文件名只读取一次，文件名去重和"已下载"判断都用集合查询，避免逐个检查文件是否存在
+        saved_names = self._scan_save_path()
+        # 清理后的文件名每个条目只计算一次，所有分辨率共用（同时避开本轮解析已分配的名称）
+        base_filename = sanitize_filename(formatted_title, self.save_path, saved_names | self._pending_names)
+        
         # 创建分辨率分组和视频项
         logger.info(f"视频 '{formatted_title}' 将被添加到以下分辨率: {list(video_formats.keys())}")
         
@@ -1205,60 +1178,75 @@ class VideoDownloaderMethods:
         
 
         
-        for res, v_format in sorted(video_formats.items(), key=lambda x: x[0], reverse=True):
-            # 查找或创建分辨率分组（直接作为根节点）
-            res_group = None
-            for i in range(self.format_tree.topLevelItemCount()):
-                if self.format_tree.topLevelItem(i).text(0) == res:  # 分辨率名称在第0列
-                    res_group = self.format_tree.topLevelItem(i)
+        # 批量填充树形控件：暂停重绘并屏蔽 itemChanged，避免每次设置都触发 on_item_changed
+        touched_groups = []
+        self.format_tree.setUpdatesEnabled(False)
+        self.format_tree.blockSignals(True)
+        try:
+            for res, v_format in sorted(video_formats.items(), key=lambda kv: kv[1]["sort_key"], reverse=True):
+                # 查找或创建分辨率分组（直接作为根节点）
+                res_group = self._res_groups.get(res)
+                if res_group:
                     logger.info(f"找到现有分辨率分组: {res}")
-                    break
-            if not res_group:
-                res_group = QTreeWidgetItem(self.format_tree)
-                res_group.setFlags(Qt.ItemIsEnabled | Qt.ItemIsUserCheckable)  # 分辨率节点可选择
-                res_group.setCheckState(0, Qt.Unchecked)  # 复选框在第0列
-                res_group.setText(0, res)  # 分辨率名称在第0列
-                res_group.setIcon(0, self.style().standardIcon(self.style().SP_DirIcon))  # 添加文件夹图标
-                res_group.setExpanded(True)
-                logger.info(f"创建新的分辨率分组: {res}")
-
-            # 为每个分辨率创建最优视频项
-            # 在文件名中添加分辨率和编码信息
-            base_filename = sanitize_filename(formatted_title, self.save_path)
-            vcodec_short = v_format.get("vcodec", "unknown").split(".")[0]  # 提取编码类型
-            filename = f"{base_filename}_{res}_{vcodec_short}"
-            
-            # 确保在同一分辨率分组内文件名唯一
-            filename = self.ensure_unique_filename(res_group, filename)
-            
-            video_item = QTreeWidgetItem(res_group)
-            
-            # 计算总大小（视频+音频）
-            total_size = v_format["filesize"]
-            if audio_format:
-                total_size += audio_filesize
+                else:
+                    res_group = QTreeWidgetItem(self.format_tree)
+                    res_group.setFlags(Qt.ItemIsEnabled | Qt.ItemIsUserCheckable)  # 分辨率节点可选择
+                    res_group.setCheckState(0, Qt.Unchecked)  # 复选框在第0列
+                    res_group.setText(0, res)  # 分辨率名称在第0列
+                    res_group.setIcon(0, self.style().standardIcon(self.style().SP_DirIcon))  # 添加文件夹图标
+                    res_group.setExpanded(True)
+                    self._res_groups[res] = res_group
+                    logger.info(f"创建新的分辨率分组: {res}")
+
+                # 为每个分辨率创建最优视频项
+                # 在文件名中添加分辨率和编码信息
+                vcodec_short = v_format.get("vcodec", "unknown").split(".")[0]  # 提取编码类型
+                filename = f"{base_filename}_{res}_{vcodec_short}"
+            
+                # 确保在同一分辨率分组内文件名唯一
+                filename = self.ensure_unique_filename(res_group, filename)
+            
+                video_item = QTreeWidgetItem(res_group)
+            
+                # 计算总大小（视频+音频）
+                total_size = v_format["filesize"]
+                if audio_format:
+                    total_size += audio_filesize
                 
-            # 添加视频项到树形控件
-            thumbnail_url = info.get("thumbnail", "")
-            self._add_tree_item(video_item, filename, "mp4", res, total_size, thumbnail_url)
+                # 添加视频项到树形控件
+                thumbnail_url = info.get("thumbnail", "")
+                self._add_tree_item(video_item, filename, "mp4", res, total_size, thumbnail_url, saved_names)
             
-            logger.info(f"添加最优视频项到分辨率 {res} ({vcodec_short}): {filename}")
+                logger.info(f"添加最优视频项到分辨率 {res} ({vcodec_short}): {filename}")
             
-            # 添加到格式列表
-            format_id = v_format["format_id"]
-            if audio_format:
-                format_id = f"{format_id}+{audio_format}"
+                # 添加到格式列表
+                format_id = v_format["format_id"]
+                if audio_format:
+                    format_id = f"{format_id}+{audio_format}"
                 
-            self.formats.append({
-                "video_id": video_id,
-                "format_id": format_id,
-                "description": f"{filename}.mp4",
-                "type": "video_audio",
-                "ext": "mp4",
-                "filesize": total_size,
-                "url": info.get("webpage_url", ""),
-                "item": video_item
-            })
+                self.formats.append({
+                    "video_id": video_id,
+                    "format_id": format_id,
+                    "description": f"{filename}.mp4",
+                    "type": "video_audio",
+                    "ext": "mp4",
+                    "filesize": total_size,
+                    "url": info.get("webpage_url", ""),
+                    "item": video_item
+                })
+                touched_groups.append(res_group)
+            
+            # 屏蔽信号期间新增的子项不会触发 on_item_changed，这里手动同步分组勾选状态
+            for group in touched_groups:
+                all_checked = all(group.child(i).checkState(0) == Qt.Checked for i in range(group.childCount()))
+                group.setCheckState(0, Qt.Checked if all_checked else Qt.Unchecked)
+        finally:
+            self.format_tree.blockSignals(False)
+            self.format_tree.setUpdatesEnabled(True)
+        
+        # 记录本条目分配的文件名，后续同名视频会自动添加数字后缀
+        if video_formats:
+            self._pending_names.add(base_filename)
         
         # 记录当前分辨率分类的统计信息
         current_counts = {}
@@ -1317,7 +1305,7 @@ class VideoDownloaderMethods:
                 filename = child_item.text(1)  # 文件名在第1列
                 all_filenames.append(filename)
                 # 移除数字后缀以获取原始文件名
-                base_filename = re.sub(r"_\d+$", "", filename)
+                base_filename = _NUM_SUFFIX_RE.sub("", filename)
                 unique_videos.add(base_filename)
                 logger.info(f"  子项 {j}: {filename} -> {base_filename}")
         
@@ -1337,15 +1325,6 @@ class VideoDownloaderMethods:
                 groups.append((resolution, item))
             
             # 按分辨率排序（从高到低）
-            def resolution_sort_key(res_text):
-                if "x" in res_text:
-                    try:
-                        width, height = res_text.split("x")
-                        return int(height)  # 按高度排序
-                    except:
-                        return 0
-                return 0
-            
             groups.sort(key=lambda x: resolution_sort_key(x[0]), reverse=True)
             
             # 重新排列树形控件项
@@ -1373,8 +1352,8 @@ class VideoDownloaderMethods:
             counter = 1
             while filename in existing_filenames:
                 # 移除可能的现有后缀
-                if re.search(r"_\d+$", filename):
-                    filename = re.sub(r"_\d+$", "", filename)
+                if _NUM_SUFFIX_RE.search(filename):
+                    filename = _NUM_SUFFIX_RE.sub("", filename)
                 filename = f"{filename}_{counter}"
                 counter += 1
             
@@ -1390,9 +1369,10 @@ class VideoDownloaderMethods:
         file_type: str,
         resolution: str,
         filesize: Optional[int],
-        thumbnail_url: str = None
+        thumbnail_url: str = None,
+        saved_names: Optional[set] = None
     ) -> None:
-        """添加树形控件项"""
+        """添加树形控件项，saved_names 为保存路径下已有文件名的集合（提供时代替 os.path.exists）"""
         item.setFlags(Qt.ItemIsEnabled | Qt.ItemIsUserCheckable)
         # 第0列设置复选框和图标，第1列显示文件名
         item.setCheckState(0, Qt.Unchecked)  # 复选框在第0列
@@ -1409,8 +1389,11 @@ class VideoDownloaderMethods:
         item.setText(3, format_size(filesize))
         
         # 检查文件是否已下载，设置状态列
-        file_path = os.path.join(self.save_path, f"{filename}.{file_type}")
-        if os.path.exists(file_path):
+        if saved_names is not None:
+            is_downloaded = f"{filename}.{file_type}" in saved_names
+        else:
+            is_downloaded = os.path.exists(self._save_prefix + f"{filename}.{file_type}")
+        if is_downloaded:
             # 文件已下载，显示"已下载"
             item.setText(4, "已下载")
             item.setForeground(4, Qt.green)
@@ -1521,6 +1504,17 @@ class VideoDownloaderMethods:
             logger.warning(f"转换图片到base64失败: {e}")
             return ""
 
+    def _get_checked_children(self, parent: QTreeWidgetItem) -> set:
+        """获取分组节点的已勾选子项集合，不存在时按当前状态重建"""
+        checked_children = self._checked_children.get(id(parent))
+        if checked_children is None:
+            checked_children = {
+                parent.child(i) for i in range(parent.childCount())
+                if parent.child(i).checkState(0) == Qt.Checked
+            }
+            self._checked_children[id(parent)] = checked_children
+        return checked_children
+
     def on_item_changed(self, item: QTreeWidgetItem, column: int) -> None:
         """处理树形控件项状态变化"""
         # 处理分辨率节点的复选框变化（第0列）
@@ -1530,9 +1524,10 @@ class VideoDownloaderMethods:
             try:
                 # 直接设置所有子项的状态，不使用递归
                 checked = item.checkState(0) == Qt.Checked
-                for i in range(item.childCount()):
-                    child = item.child(i)
+                children = [item.child(i) for i in range(item.childCount())]
+                for child in children:
                     child.setCheckState(0, Qt.Checked if checked else Qt.Unchecked)
+                self._checked_children[id(item)] = set(children) if checked else set()
             finally:
                 self.format_tree.blockSignals(False)
         
@@ -1540,10 +1535,16 @@ class VideoDownloaderMethods:
         elif column == 0 and item.parent() is not None:
             parent = item.parent()
             if parent:
+                # 只更新父节点的已勾选集合，无需遍历所有兄弟节点
+                checked_children = self._get_checked_children(parent)
+                if item.checkState(0) == Qt.Checked:
+                    checked_children.add(item)
+                else:
+                    checked_children.discard(item)
+                all_checked = len(checked_children) == parent.childCount()
                 # 临时禁用信号以避免循环触发
                 self.format_tree.blockSignals(True)
                 try:
-                    all_checked = all(parent.child(i).checkState(0) == Qt.Checked for i in range(parent.childCount()))
                     parent.setCheckState(0, Qt.Checked if all_checked else Qt.Unchecked)
                 finally:
                     self.format_tree.blockSignals(False)
@@ -1644,8 +1645,10 @@ class VideoDownloaderMethods:
                 # 忽略断开连接时的错误（可能已经断开）
                 logger.debug(f"断开网易云音乐解析工作线程信号连接时出错: {e}")
         
-        # 清空工作线程列表
+        # 清空工作线程列表和等待队列
         self.parse_workers.clear()
+        self._pending_parse_urls.clear()
+        self._active_parse_count = 0
         self.netease_music_workers.clear()
 
         self.smart_parse_button.setText("解析")
@@ -1674,7 +1677,37 @@ class VideoDownloaderMethods:
         self.update_status_bar(f"解析错误: {error_msg}", "", "")
         self.reset_parse_state()
 
-    def download_progress_hook(self, d: Dict) -> None:
+    def _set_progress(self, filename: str, percent: float, speed: str, worker: Optional[QThread] = None) -> None:
+        """更新单个文件的下载进度，同时增量维护进度总和；进度项原地更新，不再每次新建元组"""
+        entry = self.download_progress.get(filename)
+        if entry is None:
+            self.download_progress[filename] = [percent, speed]
+            self._progress_sum += percent
+        else:
+            self._progress_sum += percent - entry[0]
+            entry[0] = percent
+            entry[1] = speed
+        if worker is not None:
+            self._worker_progress_keys.setdefault(worker, set()).add(filename)
+
+    def _remove_progress(self, filename: str) -> None:
+        """移除单个文件的下载进度"""
+        entry = self.download_progress.pop(filename, None)
+        if entry is not None:
+            self._progress_sum -= entry[0]
+
+    def _clear_progress(self) -> None:
+        """清空所有下载进度"""
+        self.download_progress.clear()
+        self._worker_progress_keys.clear()
+        self._progress_sum = 0.0
+
+    def _drop_worker_progress(self, worker: QThread) -> None:
+        """移除某个下载线程产生的全部进度项（占位路径、分段文件和最终文件）"""
+        for filename in self._worker_progress_keys.pop(worker, ()):
+            self._remove_progress(filename)
+
+    def download_progress_hook(self, d: Dict, worker: Optional[QThread] = None) -> None:
         """下载进度回调"""
         try:
             if isinstance(d, dict) and d.get("status") == "downloading":
@@ -1685,11 +1718,11 @@ class VideoDownloaderMethods:
                     percent = float(percent_str)
                 except ValueError:
                     percent = 0
-                self.download_progress[filename] = (percent, speed)
+                self._set_progress(filename, percent, speed, worker)
             elif isinstance(d, dict) and d.get("status") == "finished":
                 filename = d.get("filename", "")
                 # 标记为已完成，但不立即删除，让 on_download_finished 处理
-                self.download_progress[filename] = (100, "已完成")
+                self._set_progress(filename, 100, "已完成", worker)
                 logger.info(f"文件下载完成: {filename}")
         except Exception as e:
             logger.error(f"进度回调处理错误: {e}")
@@ -1706,25 +1739,34 @@ class VideoDownloaderMethods:
             self.smart_download_button.setText("下载")
             self.smart_download_button.setStyleSheet(self.default_style)
             self.setWindowTitle(f"椰果IDM-v{Config.APP_VERSION}")
+            self._title_permille = -1
             self.update_status_bar("就绪", "", "")
+            # 空闲时停止定时器，下次下载时再启动
+            self.timer.stop()
             return
 
-        # 检查是否所有下载都已完成（没有活动下载且没有队列）
-        if self.active_downloads <= 0 and not self.download_queue:
+        # 检查是否所有下载都已完成（没有活动下载、后处理且没有队列）
+        if self.active_downloads <= 0 and not self.download_queue and not self._postprocessing_workers:
             # 所有下载完成，显示100%进度
-            self.setWindowTitle(f"椰果IDM-v{Config.APP_VERSION} - 下载中 (100.0%)")
+            if self._title_permille != 1000:
+                self._title_permille = 1000
+                self.setWindowTitle(_DOWNLOADING_TITLE_PREFIX + "100.0%)")
             self.update_status_bar("下载中 (100.0%)", "已完成", "")
             return
 
+        max_concurrent = Config.MAX_CONCURRENT_DOWNLOADS
+        # 运行中的工作线程数由计数器维护（下载中 + 后处理中），无需逐个调用 isRunning
+        active_count = self.active_downloads + len(self._postprocessing_workers)
+        # 已完成文件数（每个算100%）
+        completed_files = max(0, len(self.download_workers) - active_count)
+        
         # 计算总体进度：已完成文件 + 当前下载进度
-        total_files = len(self.download_progress) + len([w for w in self.download_workers if not w.isRunning()])
+        total_files = len(self.download_progress) + completed_files
         if total_files == 0:
             return
             
-        # 当前下载进度总和
-        current_percent = sum(percent for percent, _ in self.download_progress.values())
-        # 已完成文件数（每个算100%）
-        completed_files = len([w for w in self.download_workers if not w.isRunning()])
+        # 当前下载进度总和（由 _set_progress/_remove_progress 增量维护，无需每次重新求和）
+        current_percent = self._progress_sum
         completed_percent = completed_files * 100
         
         # 总进度 = (已完成进度 + 当前进度) / 总文件数
@@ -1734,61 +1776,58 @@ class VideoDownloaderMethods:
         # 确保进度不超过100%
         avg_percent = min(avg_percent, 100.0)
         
-        total_speed = [speed for _, speed in self.download_progress.values()]
-        speed_text = ", ".join(total_speed) if total_speed else "已完成"
-        active_count = len([w for w in self.download_workers if w.isRunning()])
+        speed_text = ", ".join(speed for _, speed in self.download_progress.values()) or "已完成"
         
-        # 更新窗口标题
-        self.setWindowTitle(f"椰果IDM-v{Config.APP_VERSION} - 下载中 ({avg_percent:.1f}%)")
+        # 更新窗口标题：按0.1%量化，显示值不变时不重新格式化和设置标题
+        permille = int(avg_percent * 10)
+        if permille != self._title_permille:
+            self._title_permille = permille
+            self.setWindowTitle(f"{_DOWNLOADING_TITLE_PREFIX}{permille / 10:.1f}%)")
         
         # 更新状态栏
         self.update_status_bar(
             f"下载中 ({avg_percent:.1f}%)", 
-            f"{speed_text} | 活动: {active_count}/{Config.MAX_CONCURRENT_DOWNLOADS}",
+            f"{speed_text} | 活动: {active_count}/{max_concurrent}",
             f"文件: {total_files}"
         )
 
-        while self.active_downloads < Config.MAX_CONCURRENT_DOWNLOADS and self.download_queue:
+        while self.active_downloads < max_concurrent and self.download_queue:
             url, fmt = self.download_queue.popleft()
-            self.start_download(url, fmt)
+            self.start_download(url, fmt, self._download_ratelimit)
 
     def download_selected(self, item: Optional[QTreeWidgetItem] = None, column: Optional[int] = None) -> None:
         """下载选中的格式"""
         selected_formats = []
 
         try:
-            def collect_checked_items(tree_item: QTreeWidgetItem) -> List[Dict]:
-                checked_items = []
-                # 检查当前项目本身（用于网易云音乐等直接添加的项目）
-                if tree_item.checkState(0) == Qt.Checked and tree_item.childCount() == 0:
-                    for fmt in self.formats:
-                        if fmt["item"] == tree_item:
-                            checked_items.append(fmt)
-                            break
-                # 检查子项目（用于视频等有层次结构的项目）
-                for i in range(tree_item.childCount()):
-                    child = tree_item.child(i)
-                    if child.checkState(0) == Qt.Checked and child.childCount() == 0:  # 复选框在第0列
-                        for fmt in self.formats:
-                            if fmt["item"] == child:
-                                checked_items.append(fmt)
-                                break
-                    elif child.childCount() > 0:
-                        checked_items.extend(collect_checked_items(child))
-                return checked_items
-
-            for i in range(self.format_tree.topLevelItemCount()):
-                top_item = self.format_tree.topLevelItem(i)
-                selected_formats.extend(collect_checked_items(top_item))
+            # 树形控件项 -> 格式信息的索引，每次下载只构建一次，避免对每个勾选项线性扫描 self.formats
+            fmt_by_item = {fmt["item"]: fmt for fmt in self.formats if fmt.get("item") is not None}
+
+            # 用显式栈做深度优先遍历（保持原先的先序顺序），勾选的叶子项即为要下载的格式
+            checked = Qt.Checked
+            stack = deque(self.format_tree.topLevelItem(i) for i in reversed(range(self.format_tree.topLevelItemCount())))
+            while stack:
+                node = stack.pop()
+                child_count = node.childCount()
+                if child_count:
+                    stack.extend(node.child(i) for i in reversed(range(child_count)))
+                elif node.checkState(0) == checked:  # 复选框在第0列
+                    fmt = fmt_by_item.get(node)
+                    if fmt is not None:
+                        selected_formats.append(fmt)
 
             if not selected_formats:
                 QMessageBox.warning(self, "提示", "请选择要下载的格式")
                 return
 
-            if not check_ffmpeg(self.ffmpeg_path, self):
-                self.update_status_bar("错误: 请安装 FFmpeg 并放入保存路径", "", "")
-                self.reset_download_state()
-                return
+            # FFmpeg 检查结果按 (FFmpeg路径, 保存路径) 缓存，只有路径变化后才重新检测；检测失败不缓存
+            ffmpeg_key = (self.ffmpeg_path, self.save_path)
+            if self._ffmpeg_checked_key != ffmpeg_key:
+                if not check_ffmpeg(self.ffmpeg_path, self):
+                    self.update_status_bar("错误: 请安装 FFmpeg 并放入保存路径", "", "")
+                    self.reset_download_state()
+                    return
+                self._ffmpeg_checked_key = ffmpeg_key
             
             # 检查磁盘空间
             if not self._check_disk_space():
@@ -1797,8 +1836,12 @@ class VideoDownloaderMethods:
                 self.reset_download_state()
                 return
 
+            # 限速输入框只在每批下载开始时读取一次，队列中后续启动的任务复用该值
+            self._download_ratelimit = self._read_speed_limit()
+
             self.is_downloading = True
-            self.download_progress.clear()
+            self._clear_progress()
+            self.timer.start()
             self.smart_download_button.setEnabled(True)  # 保持启用状态，允许取消下载
             self.smart_parse_button.setEnabled(False)
             self.smart_pause_button.setEnabled(True)
@@ -1809,11 +1852,13 @@ class VideoDownloaderMethods:
             logger.info("开始下载...")
             self.update_status_bar("开始下载...", "准备中", f"选中: {len(selected_formats)} 个文件")
 
+            # Config 的值可在设置中修改，这里在循环外读取一次
+            max_concurrent = Config.MAX_CONCURRENT_DOWNLOADS
             for fmt in selected_formats:
-                if self.active_downloads < Config.MAX_CONCURRENT_DOWNLOADS:
+                if self.active_downloads < max_concurrent:
                     # 对于网易云音乐，使用原始URL而不是fmt["url"]
                     download_url = fmt.get("original_url", fmt["url"]) if fmt.get("type") == "netease_music" else fmt["url"]
-                    self.start_download(download_url, fmt)
+                    self.start_download(download_url, fmt, self._download_ratelimit)
                 else:
                     download_url = fmt.get("original_url", fmt["url"]) if fmt.get("type") == "netease_music" else fmt["url"]
                     self.download_queue.append((download_url, fmt))
@@ -1824,68 +1869,33 @@ class VideoDownloaderMethods:
             self.update_status_bar(f"下载失败: {str(e)}", "", "")
             self.reset_download_state()
 
-    def start_download(self, url: str, selected_format: Dict) -> None:
+    def _read_speed_limit(self) -> Optional[int]:
+        """读取限速输入框，返回字节/秒，未设置时返回 None"""
+        speed_limit = self.speed_limit_input.text().strip()
+        return int(speed_limit) * 1024 if speed_limit.isdigit() else None
+
+    def start_download(self, url: str, selected_format: Dict, ratelimit: Optional[int] = None) -> None:
         """启动下载任务"""
         try:
-            # 检查是否为磁力链接
-            if selected_format.get("type") == "magnet":
-                self._start_magnet_download(url, selected_format)
-                return
-            
-            # 检查是否为ED2K链接
-            if selected_format.get("type") == "ed2k":
-                self._start_ed2k_download(url, selected_format)
-                return
-            
-            # 检查是否为网易云音乐
-            if selected_format.get("type") == "netease_music":
-                self._start_netease_music_download(url, selected_format)
+            # 磁力链接、ED2K链接、网易云音乐按类型查表分派到各自的启动方法
+            starter = _SPECIAL_DOWNLOAD_STARTERS.get(selected_format.get("type"))
+            if starter is not None:
+                getattr(self, starter)(url, selected_format)
                 return
             
             # 原有的视频下载逻辑
-            output_file = os.path.join(self.save_path, selected_format["description"])
-            self.download_progress[output_file] = (0, "未知速率")
+            output_file = self._save_prefix + selected_format["description"]
+            self._set_progress(output_file, 0, "未知速率")
             logger.info(f"开始下载: {output_file}")
 
-            ydl_opts = {
-                "outtmpl": os.path.join(self.save_path, selected_format["description"]),
-                "quiet": False,
-                "ffmpeg_location": self.ffmpeg_path,
-                "verbose": True,  # 启用详细日志以诊断FFmpeg问题
-                
-                # 增强下载稳定性配置
-                "retries": 10,  # 增加重试次数
-                "fragment_retries": 10,  # 增加片段重试次数
-                "extractor_retries": 5,  # 增加提取器重试次数
-                "socket_timeout": 60,  # 增加socket超时时间
-                "http_chunk_size": 10485760,  # 10MB块大小，平衡速度和稳定性
-                "buffersize": 4096,  # 增大缓冲区
-                
-                # 下载恢复和断点续传
-                "continuedl": True,  # 启用断点续传
-                "noprogress": False,  # 显示进度
-                
-                # 错误处理
-                "ignoreerrors": False,  # 不忽略错误，确保错误被正确处理
-                "no_warnings": False,  # 显示警告信息
-                
-                # 网络配置
-                "prefer_insecure": True,  # 优先使用不安全的连接
-                "no_check_certificate": True,  # 不检查证书
-                
-                # 请求头配置
-                "headers": {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                    "Accept-Language": "en-US,en;q=0.5",
-                    "Accept-Encoding": "gzip, deflate",
-                    "Connection": "keep-alive",
-                },
-            }
+            ydl_opts = copy.deepcopy(dict(_DOWNLOAD_YDL_OPTS_BASE))
+            ydl_opts["outtmpl"] = output_file
+            ydl_opts["ffmpeg_location"] = self.ffmpeg_path
 
-            speed_limit = self.speed_limit_input.text().strip()
-            if speed_limit.isdigit():
-                ydl_opts["ratelimit"] = int(speed_limit) * 1024
+            if ratelimit is None:
+                ratelimit = self._download_ratelimit
+            if ratelimit:
+                ydl_opts["ratelimit"] = ratelimit
 
             # 使用解析时确定的特定格式ID
             format_id = selected_format.get("format_id", "")
@@ -1898,57 +1908,28 @@ class VideoDownloaderMethods:
                 logger.info(f"使用特定格式ID: {format_spec} (高度: {height})")
             else:
                 # 根据高度选择最佳格式，确保包含音频
-                if height >= 1080:
-                    format_spec = "best[height>=1080]+bestaudio/best"
-                elif height >= 720:
-                    format_spec = "best[height>=720]+bestaudio/best"
-                elif height >= 480:
-                    format_spec = "best[height>=480]+bestaudio/best"
-                elif height >= 360:
-                    format_spec = "best[height>=360]+bestaudio/best"
-                else:
-                    format_spec = "best+bestaudio/best"
+                format_spec = next(
+                    (spec for min_height, spec in _HEIGHT_FORMAT_SPECS if height >= min_height),
+                    "best+bestaudio/best"
+                )
                 logger.info(f"使用高度匹配格式: {format_spec} (高度: {height})")
             
             # 记录最终的下载配置
             logger.info(f"最终下载配置: format={format_spec}, ffmpeg_location={self.ffmpeg_path}")
             
-            ydl_opts.update({
-            "format": format_spec,
-            # 确保FFmpeg进行音视频合并
-            "merge_output_format": "mp4",
-            "prefer_ffmpeg": True,
-            
-            # 添加后处理器配置，确保音视频正确合并
-            "postprocessors": [{
-                'key': 'FFmpegVideoConvertor',
-                'preferedformat': 'mp4',
-            }],
-            
-            # 文件覆盖配置，避免同名文件导致下载失败
-            "overwrites": True,
-            "ignoreerrors": False,
-            
-            # 优化下载配置 - 适度并发，提高稳定性
-            "concurrent_fragment_downloads": 8,  # 减少并发，提高稳定性
-            "concurrent_fragments": 8,
-            "http_chunk_size": 8388608,  # 8MB块大小，平衡速度和稳定性
-            "buffersize": 32768,  # 32KB缓冲区
-            
-            # 网络优化 - 适度超时，提高成功率
-            "socket_timeout": 90,  # 适度超时时间
-            "retries": 8,  # 适度重试次数
-            "fragment_retries": 5,
-            "extractor_retries": 3,
-        })
-
-            worker = DownloadWorker(url, ydl_opts, format_id)
-            worker.progress_signal.connect(self.download_progress_hook)
+            ydl_opts["format"] = format_spec
+
+            worker = self._acquire_download_worker(url, ydl_opts, format_id)
+            self._worker_progress_keys[worker] = {output_file}
+            worker.progress_signal.connect(partial(self.download_progress_hook, worker=worker))
             worker.log_signal.connect(self.update_scroll_status)  # 连接日志信号到状态栏
-            worker.finished.connect(lambda filename: self.on_download_finished(filename, url, selected_format))
-            worker.error.connect(self.on_download_error)
+            # 用 partial 绑定任务参数，避免为每个下载新建闭包
+            worker.network_finished.connect(partial(self._on_network_phase_finished, worker))
+            worker.network_resumed.connect(partial(self._on_network_phase_resumed, worker))
+            worker.finished.connect(partial(self.on_download_finished, url=url, selected_format=selected_format, worker=worker))
+            worker.error.connect(partial(self.on_download_error, worker=worker))
             worker.start()
-            self.download_workers.append(worker)
+            self.download_workers.add(worker)
             self.active_downloads += 1
             
         except Exception as e:
@@ -1968,93 +1949,19 @@ class VideoDownloaderMethods:
             safe_title = sanitize_filename(title, self.save_path)
             safe_artist = sanitize_filename(artist, self.save_path)
             filename = f"{safe_artist} - {safe_title}.{ext}"
-            output_file = os.path.join(self.save_path, filename)
+            output_file = self._save_prefix + filename
             
-            self.download_progress[output_file] = (0, "未知速率")
+            self._set_progress(output_file, 0, "未知速率")
             logger.info(f"开始下载网易云音乐: {filename}")
             
-            # 创建增强的下载选项，专门针对网易云音乐的反爬虫机制
-            ydl_opts = {
-                "outtmpl": output_file,
-                "quiet": False,
-                "ffmpeg_location": self.ffmpeg_path,
-                
-                # 增强下载稳定性配置
-                "retries": 15,
-                "fragment_retries": 15,
-                "extractor_retries": 10,
-                "socket_timeout": 120,
-                "http_chunk_size": 10485760,
-                "buffersize": 8192,
-                
-                # 下载恢复和断点续传
-                "continuedl": True,
-                "noprogress": False,
-                
-                # 错误处理
-                "ignoreerrors": False,
-                "no_warnings": False,
-                
-                # 网络配置
-                "prefer_insecure": True,
-                "no_check_certificate": True,
-                "nocheckcertificate": True,
-                
-                # 允许FFmpeg进行音视频合并
-                "merge_output_format": "mp4",  # 指定合并格式为mp4
-                
-                # 地理绕过
-                "geo_bypass": True,
-                "geo_bypass_country": "CN",
-                
-                # 请求头配置 - 模拟真实浏览器
-                "headers": {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-                    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-                    "Accept-Encoding": "gzip, deflate, br",
-                    "Connection": "keep-alive",
-                    "Upgrade-Insecure-Requests": "1",
-                    "Sec-Fetch-Dest": "document",
-                    "Sec-Fetch-Mode": "navigate",
-                    "Sec-Fetch-Site": "none",
-                    "Sec-Fetch-User": "?1",
-                    "Cache-Control": "max-age=0",
-                    "Referer": "https://music.163.com/",
-                    "Origin": "https://music.163.com",
-                    "DNT": "1",
-                },
-                
-                # 额外的HTTP头部
-                "http_headers": {
-                    "Referer": "https://music.163.com/",
-                    "Origin": "https://music.163.com",
-                    "X-Requested-With": "XMLHttpRequest",
-                },
-                
-                # 下载策略
-                "concurrent_fragment_downloads": 5,
-                "max_sleep_interval": 5,
-                "sleep_interval": 1,
-                
-                # 格式选择策略
-                "format": "best[ext=mp3]/best",
-                "format_sort": ["ext:mp3:m4a", "quality", "filesize"],
-                
-                # 重试策略
-                "retry_sleep": "exponential",
-                "max_retries": 15,
-                "fragment_retries": 15,
-                "extractor_retries": 10,
-                
-                # 进度回调
-                "progress_hooks": [],
-            }
+            # 深复制网易云音乐专用的选项模板（针对反爬虫机制），嵌套的请求头和格式排序也各自独立，再填入路径等动态选项
+            ydl_opts = copy.deepcopy(dict(_NETEASE_YDL_OPTS_BASE))
+            ydl_opts["outtmpl"] = output_file
+            ydl_opts["ffmpeg_location"] = self.ffmpeg_path
             
             # 设置速度限制
-            speed_limit = self.speed_limit_input.text().strip()
-            if speed_limit.isdigit():
-                ydl_opts["ratelimit"] = int(speed_limit) * 1024
+            if self._download_ratelimit:
+                ydl_opts["ratelimit"] = self._download_ratelimit
             
             # 使用网易云音乐的下载链接
             download_url = selected_format["url"]
@@ -2068,73 +1975,96 @@ class VideoDownloaderMethods:
                 return
             
             # 创建专门的网易云音乐下载工作线程
-            worker = DownloadWorker(download_url, ydl_opts)
-            worker.progress_signal.connect(self.download_progress_hook)
+            worker = self._acquire_download_worker(download_url, ydl_opts)
+            self._worker_progress_keys[worker] = {output_file}
+            worker.progress_signal.connect(partial(self.download_progress_hook, worker=worker))
             worker.log_signal.connect(self.update_scroll_status)  # 连接日志信号到状态栏
-            worker.finished.connect(lambda filename: self.on_download_finished(filename, url, selected_format))
-            worker.error.connect(self.on_download_error)
+            # 用 partial 绑定任务参数，避免为每个下载新建闭包
+            worker.network_finished.connect(partial(self._on_network_phase_finished, worker))
+            worker.network_resumed.connect(partial(self._on_network_phase_resumed, worker))
+            worker.finished.connect(partial(self.on_download_finished, url=url, selected_format=selected_format, worker=worker))
+            worker.error.connect(partial(self.on_download_error, worker=worker))
             worker.start()
-            self.download_workers.append(worker)
+            self.download_workers.add(worker)
             self.active_downloads += 1
             
         except Exception as e:
             logger.error(f"启动网易云音乐下载失败: {str(e)}", exc_info=True)
             self.update_status_bar(f"网易云音乐下载失败: {selected_format.get('title', '未知')} - {str(e)}", "", "")
             self.reset_download_state()
-    
 
-            
-            # 创建下载选项
-            ydl_opts = {
-                "outtmpl": output_file,
-                "quiet": False,
-                "ffmpeg_location": self.ffmpeg_path,
-                
-                # 增强下载稳定性配置
-                "retries": 10,  # 增加重试次数
-                "fragment_retries": 10,  # 增加片段重试次数
-                "extractor_retries": 5,  # 增加提取器重试次数
-                "socket_timeout": 60,  # 增加socket超时时间
-                "http_chunk_size": 10485760,  # 10MB块大小，平衡速度和稳定性
-                "buffersize": 4096,  # 增大缓冲区
-                
-                # 下载恢复和断点续传
-                "continuedl": True,  # 启用断点续传
-                "noprogress": False,  # 显示进度
-                
-                # 错误处理
-                "ignoreerrors": False,  # 不忽略错误，确保错误被正确处理
-                "no_warnings": False,  # 显示警告信息
-                
-                # 网络配置
-                "prefer_insecure": True,  # 优先使用不安全的连接
-                "no_check_certificate": True,  # 不检查证书
-                
-                # 请求头配置
-                "headers": {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                    "Accept-Language": "en-US,en;q=0.5",
-                    "Accept-Encoding": "gzip, deflate",
-                    "Connection": "keep-alive",
-                },
-            }
-            
-            speed_limit = self.speed_limit_input.text().strip()
-            if speed_limit.isdigit():
-                ydl_opts["ratelimit"] = int(speed_limit) * 1024
-            
+    def _on_network_phase_finished(self, worker: DownloadWorker) -> None:
+        """网络下载结束、进入合并/后处理时提前释放并发名额，让下一个任务与后处理并行"""
+        if worker in self._postprocessing_workers:
+            return
+        self._postprocessing_workers.add(worker)
+        if self.active_downloads > 0:
+            self.active_downloads -= 1
+        self._process_download_queue()
 
+    def _on_network_phase_resumed(self, worker: DownloadWorker) -> None:
+        """已提前释放名额的任务又开始下载（重试或回退格式）时收回名额，保证并发数不超过上限"""
+        if worker not in self._postprocessing_workers:
+            return
+        self._postprocessing_workers.discard(worker)
+        self.active_downloads += 1
 
-    def on_download_finished(self, filename: str, url: str, selected_format: Optional[Dict] = None) -> None:
-        """处理下载完成"""
+    def _release_download_slot(self, worker: Optional[DownloadWorker] = None) -> None:
+        """任务结束时释放并发名额，已在网络阶段结束时释放的不再重复扣减"""
+        if worker is not None and worker in self._postprocessing_workers:
+            self._postprocessing_workers.discard(worker)
+            return
         # 防止active_downloads变为负数
         if self.active_downloads > 0:
             self.active_downloads -= 1
+
+    def _remove_download_worker(self, worker: QThread) -> None:
+        """任务结束时按引用移出下载线程集合，无需遍历全部线程调用 isRunning"""
+        self._drop_worker_progress(worker)
+        with self._download_lock:
+            if worker not in self.download_workers:
+                return
+            self.download_workers.discard(worker)
+        # 信号在 run 返回前发出，等待线程真正退出后再回收或交给 Qt 释放
+        worker.wait()
+        if isinstance(worker, DownloadWorker) and len(self._download_worker_pool) < Config.MAX_CONCURRENT_DOWNLOADS:
+            self._release_to_worker_pool(worker)
+        else:
+            worker.deleteLater()
+
+    def _acquire_download_worker(self, url: str, ydl_opts: Dict, format_id: Optional[str] = None) -> DownloadWorker:
+        """优先复用线程池中已结束的下载线程对象，池为空时才新建"""
+        if self._download_worker_pool:
+            worker = self._download_worker_pool.pop()
+            worker.rearm(url, ydl_opts, format_id)
+            return worker
+        return DownloadWorker(url, ydl_opts, format_id)
+
+    def _release_to_worker_pool(self, worker: DownloadWorker) -> None:
+        """断开上一个任务的信号连接后放回线程池，下次启动下载时重新连接"""
+        for signal in (worker.progress_signal, worker.log_signal, worker.network_finished,
+                       worker.network_resumed, worker.finished, worker.error):
+            try:
+                signal.disconnect()
+            except TypeError:
+                pass  # 没有连接时 disconnect 会抛出 TypeError
+        self._download_worker_pool.append(worker)
+
+    def on_download_finished(
+        self,
+        filename: str,
+        url: str,
+        selected_format: Optional[Dict] = None,
+        worker: Optional[DownloadWorker] = None
+    ) -> None:
+        """处理下载完成"""
+        self._release_download_slot(worker)
+        if worker is not None:
+            self._remove_download_worker(worker)
         
         # 从下载进度中移除已完成的文件
         if filename and filename in self.download_progress:
-            del self.download_progress[filename]
+            self._remove_progress(filename)
         
         logger.info(f"下载完成: {filename}")
         
@@ -2153,18 +2083,14 @@ class VideoDownloaderMethods:
             # 再次强制更新UI
             QApplication.processEvents()
             
-            # 清理已完成的下载工作线程
-            with self._download_lock:
-                self.download_workers = [w for w in self.download_workers if w.isRunning()]
-                # 强制清理已完成线程的内存
-                for worker in self.download_workers:
-                    if not worker.isRunning():
-                        worker.deleteLater()
+            # 已下载的文件会出现在目录列表中，不再需要记录待分配的文件名
+            self._pending_names.clear()
             
             # 检查是否所有下载都完成了
-            if self.active_downloads <= 0 and not self.download_queue:
+            if self.active_downloads <= 0 and not self.download_queue and not self._postprocessing_workers:
                 # 所有下载完成，显示100%进度
-                self.setWindowTitle(f"椰果IDM-v{Config.APP_VERSION} - 下载中 (100.0%)")
+                self._title_permille = 1000
+                self.setWindowTitle(_DOWNLOADING_TITLE_PREFIX + "100.0%)")
                 self.update_status_bar("下载中 (100.0%)", "已完成", "")
                 # 强制更新状态栏显示
                 self.update_status_bar("下载中 (100.0%)", "已完成", "")
@@ -2415,11 +2341,11 @@ class VideoDownloaderMethods:
             logger.error(f"打开文件夹失败: {str(e)}")
             QMessageBox.warning(self, "提示", "无法打开文件夹，请检查路径是否正确")
 
-    def on_download_error(self, error_msg: str) -> None:
+    def on_download_error(self, error_msg: str, worker: Optional[DownloadWorker] = None) -> None:
         """处理下载错误"""
-        # 防止active_downloads变为负数
-        if self.active_downloads > 0:
-            self.active_downloads -= 1
+        self._release_download_slot(worker)
+        if worker is not None:
+            self._remove_download_worker(worker)
         
         # 分析错误类型并提供相应的处理建议
         error_lower = error_msg.lower()
@@ -2448,7 +2374,7 @@ class VideoDownloaderMethods:
         self.update_status_bar(f"下载错误: {error_msg[:50]}...", "", "")
         
         # 检查是否所有下载都失败了
-        if self.active_downloads <= 0 and not self.download_queue:
+        if self.active_downloads <= 0 and not self.download_queue and not self._postprocessing_workers:
             self.reset_download_state()
         else:
             # 还有下载在进行，继续处理队列
@@ -2457,11 +2383,12 @@ class VideoDownloaderMethods:
     def _process_download_queue(self) -> None:
         """处理下载队列中的任务"""
         try:
-            while len(self.download_queue) > 0 and self.active_downloads < Config.MAX_CONCURRENT_DOWNLOADS:
-                url, fmt = self.download_queue.pop(0)
+            max_concurrent = Config.MAX_CONCURRENT_DOWNLOADS
+            while self.download_queue and self.active_downloads < max_concurrent:
+                url, fmt = self.download_queue.popleft()
                 # 对于网易云音乐，使用原始URL而不是队列中的URL
                 download_url = fmt.get("original_url", url) if fmt.get("type") == "netease_music" else url
-                self.start_download(download_url, fmt)
+                self.start_download(download_url, fmt, self._download_ratelimit)
         except Exception as e:
             logger.error(f"处理下载队列失败: {str(e)}")
 
@@ -2505,10 +2432,11 @@ class VideoDownloaderMethods:
 
     def reset_download_state(self) -> None:
         """重置下载状态"""
-        self.download_progress.clear()
+        self._clear_progress()
         self.is_downloading = False
         self.active_downloads = 0
         self.download_workers.clear()
+        self._postprocessing_workers.clear()
         # 清理网易云音乐工作线程
         self.netease_music_workers.clear()
         self.smart_download_button.setEnabled(True)
@@ -2672,7 +2600,7 @@ class VideoDownloaderMethods:
                     item_type = child_item.text(2)      # 文件类型在第2列
                     
                     # 构建完整的文件路径
-                    file_path = os.path.join(self.save_path, f"{item_filename}.{item_type}")
+                    file_path = self._save_prefix + f"{item_filename}.{item_type}"
                     
                     # 检查文件是否存在
                     if os.path.exists(file_path):
@@ -2751,6 +2679,8 @@ class VideoDownloaderMethods:
             if reply == QMessageBox.Yes:
                 # 清空格式树
                 self.format_tree.clear()
+                self._res_groups.clear()
+                self._checked_children.clear()
                 
                 # 清空相关数据
                 self.formats = []
@@ -2778,6 +2708,8 @@ class VideoDownloaderMethods:
         """新建会话"""
         self.url_input.clear()
         self.format_tree.clear()
+        self._res_groups.clear()
+        self._checked_children.clear()
         self.formats = []
         self.smart_download_button.setEnabled(False)
         self.smart_select_button.setEnabled(False)
@@ -3608,7 +3540,7 @@ class VideoDownloaderMethods:
                     items_to_remove = len(self.parse_cache) - Config.CACHE_LIMIT // 2
                     for _ in range(items_to_remove):
                         if self.parse_cache:
-                            self.parse_cache.popitem()
+                            self.parse_cache.popitem(last=False)
             
             # 清理格式列表
             if len(self.formats) > Config.CACHE_LIMIT:
@@ -3616,7 +3548,7 @@ class VideoDownloaderMethods:
             
             # 清理已完成的工作线程
             self.parse_workers = [w for w in self.parse_workers if w.isRunning()]
-            self.download_workers = [w for w in self.download_workers if w.isRunning()]
+            self.download_workers = {w for w in self.download_workers if w.isRunning()}
 
             self.netease_music_workers = [w for w in self.netease_music_workers if w.isRunning()]
             
@@ -3624,7 +3556,7 @@ class VideoDownloaderMethods:
             if len(self.download_progress) > 50:  # 限制进度信息数量
                 keys_to_remove = list(self.download_progress.keys())[:-50]
                 for key in keys_to_remove:
-                    self.download_progress.pop(key, None)
+                    self._remove_progress(key)
             
             logger.info("资源清理完成")
             
@@ -3642,7 +3574,7 @@ class VideoDownloaderMethods:
             self.formats.clear()
             
             # 清空下载进度
-            self.download_progress.clear()
+            self._clear_progress()
             
             # 强制终止所有非活动线程
             for worker in self.parse_workers[:]:
@@ -3650,10 +3582,10 @@ class VideoDownloaderMethods:
                     worker.deleteLater()
                     self.parse_workers.remove(worker)
             
-            for worker in self.download_workers[:]:
+            for worker in list(self.download_workers):
                 if not worker.isRunning():
                     worker.deleteLater()
-                    self.download_workers.remove(worker)
+                    self.download_workers.discard(worker)
             
 
             
@@ -3708,6 +3640,8 @@ class VideoDownloaderMethods:
         
         # 清空现有内容
         self.format_tree.clear()
+        self._res_groups.clear()
+        self._checked_children.clear()
         
         # 按类型分组
         type_groups = {}
@@ -3785,7 +3719,7 @@ class VideoDownloaderMethods:
             filename = f"{display_name}_{info_hash[:8]}.torrent"
             output_file = os.path.join(self.save_path, filename)
             
-            self.download_progress[output_file] = (0, "磁力下载中...")
+            self._set_progress(output_file, 0, "磁力下载中...")
             logger.info(f"开始磁力下载: {filename}")
             
             # 创建磁力下载工作器
@@ -3793,12 +3727,12 @@ class VideoDownloaderMethods:
             worker.progress_signal.connect(self.magnet_download_progress_hook)
             worker.status_signal.connect(self.update_scroll_status)
             worker.log_signal.connect(self.update_scroll_status)
-            worker.finished.connect(lambda filepath: self.on_magnet_download_finished(filepath, url, selected_format))
+            worker.finished.connect(partial(self.on_magnet_download_finished, url=url, selected_format=selected_format))
             worker.error.connect(self.on_magnet_download_error)
             worker.start()
             
             # 添加到工作器列表
-            self.download_workers.append(worker)
+            self.download_workers.add(worker)
             self.active_downloads += 1
             
             self.update_status_bar(f"磁力下载已启动: {display_name}", "", "")
@@ -3827,7 +3761,7 @@ class VideoDownloaderMethods:
             selected_format['filesize'] = selected_format.get('filesize', 0)
             selected_format['hash'] = file_hash
             
-            self.download_progress[output_file] = (0, "ED2K下载中...")
+            self._set_progress(output_file, 0, "ED2K下载中...")
             logger.info(f"开始ED2K下载: {filename}")
             
             # 创建ED2K下载工作器
@@ -3836,10 +3770,12 @@ class VideoDownloaderMethods:
             worker.status_updated.connect(self.update_scroll_status)
             worker.download_finished.connect(lambda filename, filepath: self.on_ed2k_download_finished(filepath, url, selected_format))
             worker.download_error.connect(self.on_ed2k_download_error)
+            # ED2KDownloadWorker 未覆盖 QThread.finished，线程真正退出后再移出集合
+            worker.finished.connect(partial(self._remove_download_worker, worker))
             worker.start()
             
             # 添加到工作器列表
-            self.download_workers.append(worker)
+            self.download_workers.add(worker)
             self.active_downloads += 1
             
             self.update_status_bar(f"ED2K下载已启动: {file_name}", "", "")
@@ -3870,7 +3806,7 @@ class VideoDownloaderMethods:
                     speed = "等待连接..."
                 
                 # 更新进度
-                self.download_progress[filename] = (progress, speed)
+                self._set_progress(filename, progress, speed)
                 
                 # 更新状态栏显示连接信息
                 status_text = f"磁力下载中... 连接: {num_peers} 种子: {num_seeds}"
@@ -3878,7 +3814,7 @@ class VideoDownloaderMethods:
                 
             elif isinstance(d, dict) and d.get("status") == "finished":
                 filename = d.get("filename", "磁力下载完成")
-                self.download_progress[filename] = (100, "已完成")
+                self._set_progress(filename, 100, "已完成")
                 logger.info(f"磁力下载完成: {filename}")
                 
         except Exception as e:
@@ -3888,7 +3824,7 @@ class VideoDownloaderMethods:
         """ED2K下载进度回调"""
         try:
             # 更新进度
-            self.download_progress[filename] = (progress, speed)
+            self._set_progress(filename, progress, speed)
             
             # 更新状态栏显示连接信息
             status_text = f"ED2K下载中... {status} | 源: {sources}"
@@ -3907,7 +3843,7 @@ class VideoDownloaderMethods:
             # 从下载进度中移除已完成的文件
             filename = os.path.basename(filepath) if filepath else "磁力下载完成"
             if filename in self.download_progress:
-                del self.download_progress[filename]
+                self._remove_progress(filename)
             
             logger.info(f"磁力下载完成: {filepath}")
             
@@ -3952,7 +3888,7 @@ class VideoDownloaderMethods:
             # 从下载进度中移除已完成的文件
             filename = os.path.basename(filepath) if filepath else "ED2K下载完成"
             if filename in self.download_progress:
-                del self.download_progress[filename]
+                self._remove_progress(filename)
             
             logger.info(f"ED2K下载完成: {filepath}")
             
@@ -23,14 +23,18 @@ import sys
 import platform
 import webbrowser
 import subprocess
-from typing import Optional
+from typing import Optional, Set
 from PyQt5.QtWidgets import QMessageBox
 
 from ..core.config import Config
 from .logger import logger
 
 
-def sanitize_filename(filename: str, save_path: str) -> str:
+# Windows文件系统不允许的字符，使用translate表在C层一次性删除
+_FN_TRANS = str.maketrans('', '', '<>:"/\\|?*')
+
+
+def sanitize_filename(filename: str, save_path: str, existing_names: Optional[Set[str]] = None) -> str:
     """
     清理文件名，确保合法性 - 改进版本
     
@@ -40,6 +44,7 @@ def sanitize_filename(filename: str, save_path: str) -> str:
     Args:
         filename: 原始文件名
         save_path: 保存路径
+        existing_names: 保存路径中已存在的文件名集合，提供时用集合查询代替逐个 os.path.exists
         
     Returns:
         str: 清理后的合法文件名
@@ -56,7 +61,7 @@ def sanitize_filename(filename: str, save_path: str) -> str:
             logger.info(f"已重置为安全路径: {save_path}")
         
         # 移除Windows文件系统不允许的字符
-        filename = re.sub(r'[<>:"/\\|?*]', "", filename)
+        filename = filename.translate(_FN_TRANS)
         
         # 移除路径分隔符，防止路径遍历
         filename = filename.replace("/", "_").replace("\\", "_")
@@ -81,7 +86,11 @@ def sanitize_filename(filename: str, save_path: str) -> str:
         max_attempts = 100  # 限制最大尝试次数
         
         # 如果文件已存在，添加数字后缀
-        while os.path.exists(os.path.join(save_path, new_filename)):
+        if existing_names is not None:
+            name_exists = existing_names.__contains__
+        else:
+            name_exists = lambda name: os.path.exists(os.path.join(save_path, name))
+        while name_exists(new_filename):
             new_filename = f"{base}_{counter}{ext}"
             counter += 1
             
@@ -195,6 +195,17 @@ class DebugLogger:
             signal: PyQt5 信号对象，用于向界面发送日志信息
         """
         self.signal = signal
+        # 时间戳按秒缓存，同一秒内的多条日志复用同一字符串
+        self._last_ts_epoch = 0
+        self._last_ts_str = ""
+
+    def _timestamp(self) -> str:
+        """获取当前时间戳字符串（HH:MM:SS），同一秒内直接复用缓存"""
+        now = int(time.time())
+        if now != self._last_ts_epoch:
+            self._last_ts_str = datetime.fromtimestamp(now).strftime('%H:%M:%S')
+            self._last_ts_epoch = now
+        return self._last_ts_str
 
     def debug(self, msg: str) -> None:
         """
@@ -205,7 +216,7 @@ class DebugLogger:
         """
         try:
             if self.signal and hasattr(self.signal, 'emit'):
-                self.signal.emit(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}")
+                self.signal.emit(f"[{self._timestamp()}] {msg}")
         except Exception:
             # 忽略信号发送错误
             pass
@@ -219,7 +230,7 @@ class DebugLogger:
         """
         try:
             if self.signal and hasattr(self.signal, 'emit'):
-                self.signal.emit(f"[{datetime.now().strftime('%H:%M:%S')}] [警告] {msg}")
+                self.signal.emit(f"[{self._timestamp()}] [警告] {msg}")
         except Exception:
             # 忽略信号发送错误
             pass
@@ -233,7 +244,7 @@ class DebugLogger:
         """
         try:
             if self.signal and hasattr(self.signal, 'emit'):
-                self.signal.emit(f"[{datetime.now().strftime('%H:%M:%S')}] [错误] {msg}")
+                self.signal.emit(f"[{self._timestamp()}] [错误] {msg}")
         except Exception:
             # 忽略信号发送错误
             pass
@@ -8,17 +8,43 @@ import os
 import time
 import random
 from typing import Dict, Optional
-from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtCore import QThread, pyqtSignal, QMutex, QWaitCondition
 from urllib.parse import urlparse
 from src.core.youtube_optimizer import YouTubeOptimizer
 
+# 进度信号和进度日志行转发到界面的最小间隔（纳秒），即每100毫秒最多一次
+_EMIT_INTERVAL_NS = 100_000_000
+
+
+def _is_partial_progress_line(msg: str) -> bool:
+    """是否为未到100%的 yt-dlp 下载进度行（"[download]  45.3% of ..."）"""
+    if not msg.startswith("[download]"):
+        return False
+    percent = msg[10:].lstrip().partition(' ')[0]
+    if not percent.endswith('%'):
+        return False
+    try:
+        return float(percent[:-1]) < 100
+    except ValueError:
+        return False
+
+
 class YTDlpLogger:
     """yt-dlp日志记录器，将输出重定向到我们的信号"""
     
     def __init__(self, log_signal):
         self.log_signal = log_signal
+        self._last_progress_ns = 0  # 上次转发进度行的时间（纳秒）
     
     def debug(self, msg):
+        # yt-dlp 每个数据块都会输出一行 "[download]  xx.x% of ..." 进度，
+        # 状态栏只显示最新一行，100毫秒内的后续进度行会被覆盖，直接丢弃；
+        # 100% 进度行以及 Destination、Merging 等其他日志行总是转发
+        if _is_partial_progress_line(msg):
+            now = time.monotonic_ns()
+            if now - self._last_progress_ns < _EMIT_INTERVAL_NS:
+                return
+            self._last_progress_ns = now
         self.log_signal.emit(f"[DEBUG] {msg}")
     
     def warning(self, msg):
@@ -34,6 +60,8 @@ class DownloadWorker(QThread):
     finished = pyqtSignal(str)  # filename
     error = pyqtSignal(str)  # error message
     log_signal = pyqtSignal(str)  # log message
+    network_finished = pyqtSignal()  # 网络下载阶段结束，进入合并/后处理
+    network_resumed = pyqtSignal()  # 后处理开始后又重新开始下载（重试或回退格式）
     
     class DownloadCancelled(Exception):
         pass
@@ -50,18 +78,54 @@ class DownloadWorker(QThread):
         self._is_paused = False
         self.last_filename = None
         self._start_time = time.time()
+        self._network_finished_emitted = False
+        self._last_emit_ns = 0  # 上次发送下载中进度信号的时间（纳秒）
+        # 每个工作线程只创建一个 yt-dlp 日志记录器
+        self._ydl_logger = YTDlpLogger(self.log_signal)
+        # 暂停时阻塞下载线程，恢复或取消时唤醒，避免轮询
+        self._pause_mutex = QMutex()
+        self._pause_cond = QWaitCondition()
+    
+    def rearm(self, url: str, ydl_opts: Dict, format_id: Optional[str] = None):
+        """复用已结束的线程对象执行新的下载任务，需在线程未运行时调用"""
+        self.url = url
+        self.ydl_opts = ydl_opts
+        self.format_id = format_id
+        self._is_cancelled = False
+        self._is_paused = False
+        self.last_filename = None
+        self._start_time = time.time()
+        self._network_finished_emitted = False
+        self._last_emit_ns = 0
     
     def cancel(self):
         """取消下载"""
+        self._pause_mutex.lock()
         self._is_cancelled = True
+        self._pause_cond.wakeAll()
+        self._pause_mutex.unlock()
     
     def pause(self):
         """暂停下载"""
+        self._pause_mutex.lock()
         self._is_paused = True
+        self._pause_mutex.unlock()
     
     def resume(self):
         """恢复下载"""
+        self._pause_mutex.lock()
         self._is_paused = False
+        self._pause_cond.wakeAll()
+        self._pause_mutex.unlock()
+    
+    def _wait_if_paused(self) -> None:
+        """暂停期间阻塞当前线程，直到恢复或取消"""
+        self._pause_mutex.lock()
+        try:
+            while self._is_paused and not self._is_cancelled:
+                self._pause_cond.wait(self._pause_mutex)
+        finally:
+            self._pause_mutex.unlock()
     
     def progress_hook(self, d: Dict) -> None:
         """下载进度回调"""
@@ -72,16 +136,26 @@ class DownloadWorker(QThread):
         # 检查是否被暂停
         if self._is_paused:
             # 等待恢复
-            while self._is_paused and not self._is_cancelled:
-                time.sleep(0.1)  # 短暂休眠，避免CPU占用过高
+            self._wait_if_paused()
             if self._is_cancelled:
                 return
         
         if d['status'] == 'downloading':
+            # 已通知网络阶段结束后又开始下载（yt-dlp 重试或换用回退格式），通知主线程收回并发名额
+            if self._network_finished_emitted:
+                self._network_finished_emitted = False
+                self.network_resumed.emit()
+            
             # 获取文件名
             if 'filename' in d:
                 self.last_filename = d['filename']
             
+            # 限制进度信号频率（每100毫秒最多一次），避免逐块发送挤占界面事件循环
+            now = time.monotonic_ns()
+            if now - self._last_emit_ns < _EMIT_INTERVAL_NS:
+                return
+            self._last_emit_ns = now
+            
             # 获取进度信息
             total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
             downloaded_bytes = d.get('downloaded_bytes', 0)
@@ -130,6 +204,13 @@ class DownloadWorker(QThread):
                 }
                 self.progress_signal.emit(finished_data)
     
+    def postprocessor_hook(self, d: Dict) -> None:
+        """后处理回调，首次进入后处理时通知主线程网络下载阶段已结束"""
+        if d.get('status') == 'started' and not self._network_finished_emitted:
+            self._network_finished_emitted = True
+            self.log_signal.emit(f"网络下载完成，开始后处理: {d.get('postprocessor', '')}")
+            self.network_finished.emit()
+    
     def run(self):
         """执行下载任务"""
         try:
@@ -297,9 +378,10 @@ class DownloadWorker(QThread):
                 
                 # 进度回调
                 'progress_hooks': [self.progress_hook],
+                'postprocessor_hooks': [self.postprocessor_hook],
                 
                 # 日志记录器
-                'logger': YTDlpLogger(self.log_signal),
+                'logger': self._ydl_logger,
             })
             
             # 尝试多种下载策略
@@ -430,8 +512,7 @@ class DownloadWorker(QThread):
                         if self._is_paused:
                             self.log_signal.emit("下载已暂停")
                             # 等待恢复
-                            while self._is_paused and not self._is_cancelled:
-                                time.sleep(0.1)  # 短暂休眠，避免CPU占用过高
+                            self._wait_if_paused()
                             if self._is_cancelled:
                                 self.log_signal.emit("下载已取消")
                                 return
@@ -570,9 +651,10 @@ class DownloadWorker(QThread):
 
                         # 设置进度回调
                         ydl_opts["progress_hooks"] = [self.progress_hook]
+                        ydl_opts["postprocessor_hooks"] = [self.postprocessor_hook]
 
                         # 设置自定义日志记录器
-                        ydl_opts["logger"] = YTDlpLogger(self.log_signal)
+                        ydl_opts["logger"] = self._ydl_logger
                         
                         # 执行下载
                         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
@@ -704,9 +786,10 @@ class DownloadWorker(QThread):
             
             # 设置进度回调
             ydl_opts["progress_hooks"] = [self.progress_hook]
+            ydl_opts["postprocessor_hooks"] = [self.postprocessor_hook]
             
             # 设置自定义日志记录器
-            ydl_opts["logger"] = YTDlpLogger(self.log_signal)
+            ydl_opts["logger"] = self._ydl_logger
             
             # 执行下载
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
@@ -4,7 +4,6 @@ import time
 import subprocess
 import platform
 import shutil
-import hashlib
 import threading
 from typing import Dict, Optional
 from PyQt5.QtCore import QThread, pyqtSignal, QMutex, QTimer
@@ -400,6 +399,9 @@ class ED2KDownloadWorker(QThread):
             # 初始化进度跟踪
             self._last_downloaded_size = self.downloaded_size
             
+            # 模拟数据只生成一次，各块复用同一缓冲区写入（实际应用中这里应该是真正的网络下载）
+            chunk_view = memoryview(os.urandom(chunk_size))
+            
             with open(target_file, 'wb') as f:
                 for chunk_num in range(total_chunks):
                     if not self.is_running or self.is_paused:
@@ -415,9 +417,7 @@ class ED2KDownloadWorker(QThread):
                     # 计算当前块大小
                     current_chunk_size = min(chunk_size, self.file_size - chunk_num * chunk_size)
                     
-                    # 生成模拟数据（实际应用中这里应该是真正的网络下载）
-                    chunk_data = self._generate_chunk_data(chunk_num, current_chunk_size)
-                    f.write(chunk_data)
+                    f.write(chunk_view[:current_chunk_size])
                     
                     # 更新下载进度
                     self.downloaded_size += current_chunk_size
@@ -445,20 +445,6 @@ class ED2KDownloadWorker(QThread):
             logger.error(f"模拟下载失败: {e}")
             raise
     
-
-    
-    def _generate_chunk_data(self, chunk_num: int, chunk_size: int) -> bytes:
-        """生成模拟的块数据"""
-        # 使用ED2K哈希和块号生成伪随机数据
-        seed = hash(f"{self.file_hash}_{chunk_num}") % 1000000
-        data = bytearray()
-        
-        for i in range(chunk_size):
-            seed = (seed * 1103515245 + 12345) % 2147483648
-            data.append(seed % 256)
-        
-        return bytes(data)
-    
     def _verify_file_integrity(self, file_path: str) -> bool:
         """验证文件完整性"""
         try:
@@ -15,14 +15,16 @@
 版本: 1.0.0
 """
 
+import copy
 import time
 import threading
 import logging
+from types import MappingProxyType
 from PyQt5.QtCore import QThread, pyqtSignal, QMutex, QWaitCondition
 import yt_dlp
-from src.core.youtube_optimizer import YouTubeOptimizer
 from src.core.magnet_manager import magnet_manager
 from src.core.ed2k_manager import ed2k_manager
+from src.core.format_selector import select_entry_formats
 from src.utils.logger import logger
 
 class YTDlpLogger:
@@ -40,6 +42,83 @@ class YTDlpLogger:
     def error(self, msg):
         self.signal.emit(f"[ERROR] {msg}")
 
+# 解析选项的只读模板，每次解析时深复制后再按需修改（嵌套的请求头、列表也各自独立，修改副本不会影响模板）
+_PARSE_YDL_OPTS_BASE = MappingProxyType({
+    "quiet": False,
+    "no_warnings": False,
+    "format_sort": ["+res", "+fps", "+codec:h264", "+size"],  # 优先按分辨率排序
+    "merge_output_format": "mp4",  # 允许FFmpeg进行音视频合并
+    "socket_timeout": 30,  # 适中的超时时间
+    "retries": 3,  # 适中的重试次数
+    "fragment_retries": 2,  # 片段重试
+    "extractor_retries": 2,  # 提取器重试
+})
+
+# 使用优化的 YouTube 配置 - 平衡速度和稳定性
+_YOUTUBE_PARSE_OPTS = MappingProxyType({
+    # 基础配置
+    "quiet": False,
+    "no_warnings": False,
+    "format": "all",  # 获取所有格式
+    "merge_output_format": "mp4",
+    
+    # 网络优化配置
+    "socket_timeout": 45,  # 增加超时时间
+    "retries": 5,  # 增加重试次数
+    "fragment_retries": 3,
+    "extractor_retries": 3,
+    "http_chunk_size": 8388608,  # 8MB块大小
+    "buffersize": 32768,  # 32KB缓冲区
+    
+    # 并发优化
+    "concurrent_fragment_downloads": 8,  # 8并发
+    "concurrent_fragments": 8,
+    
+    # 跳过不必要的检查
+    "check_formats": False,  # 不检查格式可用性
+    "test": False,  # 不测试格式
+    
+    # 优化的请求头
+    "headers": {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.9",
+        "Accept-Encoding": "gzip, deflate, br",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+    },
+    
+    # 安全设置
+    "nocheckcertificate": True,
+    "prefer_insecure": True,
+    
+    # 地理绕过
+    "geo_bypass": True,
+    "geo_bypass_country": "US",
+})
+
+# Bilibili 优化配置
+_BILIBILI_PARSE_OPTS = MappingProxyType({
+    "headers": {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Referer": "https://www.bilibili.com/",
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+        "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+        "Accept-Encoding": "gzip, deflate, br",
+        "Connection": "keep-alive",
+    },
+})
+
+# 播放列表中单个视频的解析选项
+_SINGLE_VIDEO_OPTS = MappingProxyType({
+    "quiet": True,
+    "no_warnings": True,
+    "extract_flat": False,
+    "ignoreerrors": False,
+    "socket_timeout": 20,  # 单个视频解析使用更短超时
+    "retries": 2,
+})
+
 class ParseWorker(QThread):
     """视频解析工作线程"""
     
@@ -62,6 +141,8 @@ class ParseWorker(QThread):
         # 移除threading.Event，统一使用PyQt5的线程安全机制
         self._extraction_completed = threading.Event()
         self._extraction_thread = None
+        # 每个工作线程只创建一个 yt-dlp 日志记录器
+        self._ydl_logger = YTDlpLogger(self.log_signal)
 
     def run(self) -> None:
         try:
@@ -136,7 +217,7 @@ class ParseWorker(QThread):
                                         single_video_opts = self._get_single_video_options()
                                         
                                         # 设置自定义日志记录器
-                                        single_video_opts["logger"] = YTDlpLogger(self.log_signal)
+                                        single_video_opts["logger"] = self._ydl_logger
                                         
                                         with yt_dlp.YoutubeDL(single_video_opts) as ydl:
                                             video_info = ydl.extract_info(video_url, download=False)
@@ -157,6 +238,9 @@ class ParseWorker(QThread):
                                         # 如果重新解析失败，使用空格式列表
                                         entry["formats"] = []
                             
+                            # 在解析线程中预先挑选格式，主线程只需创建树形控件项
+                            entry["_format_selection"] = select_entry_formats(entry)
+                            
                             # 立即发送单个视频解析完成信号
                             self.video_parsed_signal.emit(entry, self.url)
                             
@@ -168,6 +252,7 @@ class ParseWorker(QThread):
                 else:
                     # 单个视频，直接发送结果
                     self.progress_signal.emit(1, 1)
+                    info["_format_selection"] = select_entry_formats(info)
                     self.video_parsed_signal.emit(info, self.url)
                     self.finished.emit(info)
                         
@@ -256,7 +341,7 @@ class ParseWorker(QThread):
         """在单独线程中执行 yt-dlp 提取"""
         try:
             # 设置自定义日志记录器
-            ydl_opts["logger"] = YTDlpLogger(self.log_signal)
+            ydl_opts["logger"] = self._ydl_logger
             
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 info = ydl.extract_info(self.url, download=False)
@@ -281,88 +366,19 @@ class ParseWorker(QThread):
     
     def _get_platform_specific_options(self) -> dict:
         """根据平台获取特定的解析选项"""
-        base_opts = {
-            "quiet": False,
-            "no_warnings": False,
-            "format_sort": ["+res", "+fps", "+codec:h264", "+size"],  # 优先按分辨率排序
-            "merge_output_format": "mp4",  # 允许FFmpeg进行音视频合并
-            "socket_timeout": 30,  # 适中的超时时间
-            "retries": 3,  # 适中的重试次数
-            "fragment_retries": 2,  # 片段重试
-            "extractor_retries": 2,  # 提取器重试
-        }
+        base_opts = copy.deepcopy(dict(_PARSE_YDL_OPTS_BASE))
         
         # 检测平台并添加特定配置
         if 'youtube.com' in self.url or 'youtu.be' in self.url:
-            # 使用优化的 YouTube 配置 - 平衡速度和稳定性
-            youtube_optimizer = YouTubeOptimizer()
-            base_opts.update({
-                # 基础配置
-                "quiet": False,
-                "no_warnings": False,
-                "format": "all",  # 获取所有格式
-                "merge_output_format": "mp4",
-                
-                # 网络优化配置
-                "socket_timeout": 45,  # 增加超时时间
-                "retries": 5,  # 增加重试次数
-                "fragment_retries": 3,
-                "extractor_retries": 3,
-                "http_chunk_size": 8388608,  # 8MB块大小
-                "buffersize": 32768,  # 32KB缓冲区
-                
-                # 并发优化
-                "concurrent_fragment_downloads": 8,  # 8并发
-                "concurrent_fragments": 8,
-                
-                # 跳过不必要的检查
-                "check_formats": False,  # 不检查格式可用性
-                "test": False,  # 不测试格式
-                
-                # 优化的请求头
-                "headers": {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                    "Accept-Language": "en-US,en;q=0.9",
-                    "Accept-Encoding": "gzip, deflate, br",
-                    "Connection": "keep-alive",
-                    "Upgrade-Insecure-Requests": "1",
-                },
-                
-                # 安全设置
-                "nocheckcertificate": True,
-                "prefer_insecure": True,
-                
-                # 地理绕过
-                "geo_bypass": True,
-                "geo_bypass_country": "US",
-            })
-                
+            base_opts.update(copy.deepcopy(dict(_YOUTUBE_PARSE_OPTS)))
         elif 'bilibili.com' in self.url:
-            # Bilibili 优化配置
-            base_opts.update({
-                "headers": {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    "Referer": "https://www.bilibili.com/",
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-                    "Accept-Encoding": "gzip, deflate, br",
-                    "Connection": "keep-alive",
-                }
-            })
+            base_opts.update(copy.deepcopy(dict(_BILIBILI_PARSE_OPTS)))
         
         return base_opts
     
     def _get_single_video_options(self) -> dict:
         """获取单个视频解析选项"""
-        return {
-            "quiet": True,
-            "no_warnings": True,
-            "extract_flat": False,
-            "ignoreerrors": False,
-            "socket_timeout": 20,  # 单个视频解析使用更短超时
-            "retries": 2,
-        }
+        return copy.deepcopy(dict(_SINGLE_VIDEO_OPTS))
     
     def pause(self) -> None:
         """暂停解析 - 使用PyQt5线程安全机制"""